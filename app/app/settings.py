@@ -25,6 +25,12 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'changeme')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = bool(int(os.environ.get('DEBUG', 0)))
 
+# "full" serves everything, "api" only /api/recipe/ and /api/user/ with a
+# trimmed set of apps and middleware. Run the admin, sessions and the
+# OpenAPI views in a separate "full" process.
+APP_PROFILE = os.environ.get('APP_PROFILE', 'full')
+API_ONLY = APP_PROFILE == 'api'
+
 ALLOWED_HOSTS = []
 ALLOWED_HOSTS.extend(
     filter(
@@ -51,8 +57,22 @@ INSTALLED_APPS = [
     'recipe',
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in (
+            'django.contrib.admin',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.staticfiles',
+            'drf_spectacular',
+        )
+    ]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryLogMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,7 +81,19 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+if API_ONLY:
+    # API views authenticate with tokens, so no sessions or CSRF
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE
+        if middleware not in (
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        )
+    ]
+
+ROOT_URLCONF = 'app.urls_api' if API_ONLY else 'app.urls'
 
 TEMPLATES = [
     {
@@ -95,6 +127,84 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2. Safe-method reads
+# are spread over them by core.routers.PrimaryReplicaRouter.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')),
+    start=1,
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Replicas lagging more than this many seconds are skipped
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+# How often each worker re-measures a replica's lag, in seconds
+DATABASE_REPLICA_LAG_CHECK = float(os.environ.get('DB_REPLICA_LAG_CHECK', 5))
+# How long a client's reads stay on the primary after it writes
+DATABASE_PIN_SECONDS = int(os.environ.get('DB_PIN_SECONDS', 10))
+
+
+# Caches
+# A shared Redis compatible server when REDIS_URL is set, otherwise each
+# process keeps its own local memory cache (development and tests).
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    REDIS_TIMEOUT = float(os.environ.get('REDIS_TIMEOUT', 0.5))
+    SHARED_CACHE = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'SOCKET_CONNECT_TIMEOUT': REDIS_TIMEOUT,
+            'SOCKET_TIMEOUT': REDIS_TIMEOUT,
+        },
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    }
+
+CACHES = {
+    'default': {
+        **SHARED_CACHE,
+        'KEY_PREFIX': 'app',
+        # Bump to drop every cached value, e.g. after a format change
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'local',
+    },
+    # Read-mostly data, see core.caching.TieredCache
+    'tiered': {
+        'BACKEND': 'core.caching.TieredCache',
+        'OPTIONS': {
+            'L1': 'local',
+            'L2': 'default',
+            'L1_TIMEOUT': int(os.environ.get('CACHE_L1_TIMEOUT', 5)),
+        },
+    },
+}
+
+# How long an API token lookup is cached, see core.authentication
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+# How long a serialized recipe is kept, keyed by its updated_at
+RECIPE_CACHE_TIMEOUT = 3600
+# How long tag and ingredient name lookups are kept, dropped on writes
+AUTOCOMPLETE_CACHE_TIMEOUT = 3600
+# How long shopping lists are kept, dropped on recipe or ingredient writes
+SHOPPING_LIST_CACHE_TIMEOUT = 3600
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -138,6 +248,32 @@ MEDIA_URL = '/static/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+# Statements slower than this are logged with their view and user, see
+# core.querylog; empty disables the log
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200) or 'inf')
+# Share of requests whose SQL is traced into the admin's fingerprints
+SQL_TRACE_SAMPLE_RATE = float(os.environ.get('SQL_TRACE_SAMPLE_RATE', 0))
+
+# Limits of uploaded recipe images, see core.images; nginx accepts
+# request bodies of up to 10M
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 ** 2)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_PIXELS', 25_000_000)
+)
+
+# Resized recipe images, see core.thumbnails. Kept out of /vol/web, which
+# nginx serves publicly under /static.
+THUMBNAIL_ROOT = os.environ.get('THUMBNAIL_ROOT', '/vol/thumbnails')
+THUMBNAIL_CACHE_MAX_SIZE = int(
+    os.environ.get('THUMBNAIL_CACHE_MAX_SIZE', 1024 ** 3)
+)
+THUMBNAIL_WIDTHS = (64, 160, 320, 640, 1280)
+# Internal nginx location serving THUMBNAIL_ROOT; when empty the files
+# are sent by Django
+THUMBNAIL_ACCEL_PREFIX = os.environ.get('THUMBNAIL_ACCEL_PREFIX', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -147,8 +283,59 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson backed JSON, falls back to the stdlib when orjson is missing
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Token bucket budgets for core.throttling.TokenBucketThrottle scopes
+    'DEFAULT_THROTTLE_RATES': {
+        'recipe_write': os.environ.get('THROTTLE_RECIPE_WRITE', '60/min'),
+        'recipe_upload': os.environ.get('THROTTLE_RECIPE_UPLOAD', '20/min'),
+        'user_create': os.environ.get('THROTTLE_USER_CREATE', '10/hour'),
+    },
 }
 
+if API_ONLY:
+    REST_FRAMEWORK.update({
+        'DEFAULT_RENDERER_CLASSES': ['core.renderers.ORJSONRenderer'],
+        'DEFAULT_AUTHENTICATION_CLASSES': [
+            'core.authentication.CachedTokenAuthentication',
+        ],
+    })
+
+# Idempotency-Key handling, see core.idempotency
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 3600))
+# Longest a retry waits on the first request before answering 409
+IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT', 10))
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Most requests accepted by /api/batch/
+BATCH_MAX_REQUESTS = 20
+
+# Bulk actions: most IDs per request, and rows changed per transaction
+BULK_MAX_IDS = 5000
+BULK_CHUNK_SIZE = 500
+# Most copies made by one recipe clone request
+RECIPE_CLONE_MAX = 50
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
-}
\ No newline at end of file
+}
+
+# Pre-built OpenAPI schema artifacts, see core.schema
+SCHEMA_ROOT = os.environ.get('SCHEMA_ROOT', BASE_DIR / 'openapi')
+
+# Background jobs, see core.jobs
+# Seconds before the first retry, doubled on every further attempt
+JOB_RETRY_BACKOFF = int(os.environ.get('JOB_RETRY_BACKOFF', 10))
+JOB_RETRY_BACKOFF_MAX = int(os.environ.get('JOB_RETRY_BACKOFF_MAX', 3600))
+# Running jobs not finished, or reporting progress, within this many
+# seconds are queued again
+JOB_LOCK_TIMEOUT = int(os.environ.get('JOB_LOCK_TIMEOUT', 1800))
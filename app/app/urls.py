@@ -14,7 +14,6 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from drf_spectacular.views import (
-    SpectacularAPIView,
     SpectacularRedocView,
     SpectacularSwaggerView)
 from django.contrib import admin
@@ -22,12 +21,11 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
-from core import views as core_views
+from core.schema import CachedSpectacularAPIView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("api/health-check/", core_views.health_check, name="health-check"),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('api/schema/', CachedSpectacularAPIView.as_view(), name='api-schema'),
     path(
         'api/swagger/',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
@@ -38,8 +36,7 @@ urlpatterns = [
         SpectacularRedocView.as_view(url_name='api-schema'),
         name='redoc'
     ),
-    path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls')),
+    path('', include('app.urls_api')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,15 @@
+"""API URL configuration
+
+Served on its own by API-only workers (APP_PROFILE=api) and included by
+app.urls in the full profile.
+"""
+from django.urls import path, include
+
+from core import views as core_views
+
+urlpatterns = [
+    path("api/health-check/", core_views.health_check, name="health-check"),
+    path('api/user/', include('user.urls')),
+    path('api/recipe/', include('recipe.urls')),
+    path('api/', include('core.urls')),
+]
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+if bool(int(os.environ.get('WSGI_PRELOAD', 0))):
+    # Import the URLconf, and with it every view and serializer, before
+    # uWSGI forks its workers so they share these pages copy-on-write.
+    # No database connection is opened here.
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    # Keep the garbage collector from touching (and so copying) the
+    # preloaded objects in every worker.
+    gc.freeze()
@@ -1,16 +1,66 @@
 """
 Django admin customization
 """
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.files.uploadedfile import UploadedFile
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
 from django.utils.translation import gettext as _
+from core.images import validate_image
 from . import models
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator using Postgres' row estimate for big unfiltered tables.
+
+    Counting every row of a table with millions of rows takes seconds;
+    the planner's estimate is free and close enough for page links.
+    Filtered lists and small tables are counted exactly.
+    """
+    estimate_above = 100000
+
+    def estimated_count(self):
+        """Return the table's estimated row count, None if unavailable"""
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if queryset.query.where or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is not None and estimate > self.estimate_above:
+            return estimate
+        return self.object_list.count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables too big to count or scan"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # Avoids a second unfiltered COUNT(*)
+    ordering = ('-id',)  # Walks the primary key index
+    raw_id_fields = ('user',)
+    list_select_related = ('user',)
+
+
 class UserAdmin(BaseUserAdmin):
     """Define admin pages for User model"""
     ordering = ['id']
     list_display = ['email', 'name']
+    search_fields = ['=email']
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (
@@ -36,7 +86,69 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeForm(forms.ModelForm):
+    """Recipe form validating newly uploaded images, see core.images"""
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Stored images are not re-read when other fields are edited
+        if isinstance(image, UploadedFile):
+            validate_image(image)
+        return image
+
+
+class RecipeAdmin(LargeTableAdmin):
+    """Define admin pages for recipes"""
+    form = RecipeForm
+    list_display = ('title', 'user', 'time_minutes', 'price', 'updated_at')
+    # Prefix searches use the UPPER(title) index, see migration 0009
+    search_fields = ('^title', '=user__email')
+    autocomplete_fields = ('tags', 'ingredients')
+
+
+class RecipeAttrAdmin(LargeTableAdmin):
+    """Define admin pages for tags and ingredients"""
+    list_display = ('name', 'user')
+    search_fields = ('^name',)
+
+
+class JobAdmin(LargeTableAdmin):
+    """Define admin pages for background jobs"""
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'user')
+    list_filter = ('status',)
+
+
+class QueryFingerprintAdmin(admin.ModelAdmin):
+    """Define read-only admin pages for traced SQL, see core.querylog"""
+    list_display = (
+        'statement_start', 'view', 'count', 'total_time', 'mean_time',
+        'max_time', 'last_seen',
+    )
+    ordering = ('-total_time',)
+    search_fields = ('view',)
+    readonly_fields = (
+        'fingerprint', 'view', 'statement', 'count', 'total_time',
+        'max_time', 'last_seen',
+    )
+
+    @admin.display(description=_('statement'))
+    def statement_start(self, obj):
+        return Truncator(obj.statement).chars(80)
+
+    @admin.display(description=_('mean time'))
+    def mean_time(self, obj):
+        return obj.total_time / obj.count if obj.count else 0
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
\ No newline at end of file
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Tag, RecipeAttrAdmin)
+admin.site.register(models.Ingredient, RecipeAttrAdmin)
+admin.site.register(models.Job, JobAdmin)
+admin.site.register(models.QueryFingerprint, QueryFingerprintAdmin)
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Token authentication served from the two level cache
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.caching import get_tiered_cache
+
+
+def token_cache_key(key):
+    """Return the cache key of the API token `key`"""
+    return f'auth_token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def forget_tokens(keys):
+    """Drop cached lookups of the given tokens"""
+    get_tiered_cache().delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication without a database query on every request.
+
+    The token and its user are cached for AUTH_TOKEN_CACHE_TIMEOUT seconds
+    and dropped when either changes (see core.signals); other processes
+    may keep using their in-process copy for up to the L1 timeout.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+
+        def load():
+            try:
+                return model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        token = get_tiered_cache().get_or_set(
+            token_cache_key(key), load, settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return (token.user, token)
@@ -0,0 +1,293 @@
+"""
+Two level caching with stampede protection and versioned key namespaces
+"""
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+_MISSING = object()
+
+
+class Entry:
+    """A value stored by `get_or_set` with what early refresh needs"""
+    __slots__ = ('value', 'delta', 'expires')
+
+    def __init__(self, value, delta, expires):
+        self.value = value
+        self.delta = delta  # Seconds it took to compute the value
+        self.expires = expires  # Wall clock expiry, None for never
+
+    def __getstate__(self):
+        return (self.value, self.delta, self.expires)
+
+    def __setstate__(self, state):
+        self.value, self.delta, self.expires = state
+
+    def refresh_early(self, beta):
+        """
+        Return True when this reader should recompute the value now.
+
+        Probabilistic early expiration (XFetch): the closer the entry is
+        to expiring and the longer it takes to compute, the more likely a
+        reader refreshes it, so one request does it before the rest see a
+        miss together.
+        """
+        if self.expires is None:
+            return False
+        jitter = -self.delta * beta * math.log(1 - random.random())
+        return time.time() + jitter >= self.expires
+
+
+def unwrap(value):
+    return value.value if isinstance(value, Entry) else value
+
+
+class TieredCache(BaseCache):
+    """
+    In-process L1 cache in front of a shared L2 cache.
+
+    Reads are served from L1 for at most L1_TIMEOUT seconds, so writes
+    from other processes may take that long to be seen; writes and deletes
+    go to both levels. `get_or_set` computes a missing value once per
+    process, and across processes through a lock in L2, and refreshes hot
+    values early instead of letting them expire under load.
+
+        'tiered': {
+            'BACKEND': 'core.caching.TieredCache',
+            'OPTIONS': {'L1': 'local', 'L2': 'default', 'L1_TIMEOUT': 5},
+        }
+
+    Keys and versions are passed through unchanged, so the L1 and L2
+    aliases' KEY_PREFIX and VERSION settings apply.
+    """
+    _flights = {}  # key -> [lock, waiters], shared by every thread
+    _flights_lock = threading.Lock()
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l1_alias = options.get('L1', 'local')
+        self.l2_alias = options.get('L2', 'default')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.beta = options.get('BETA', 1.0)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self.lock_wait = options.get('LOCK_WAIT', 5)
+        self.poll_interval = options.get('POLL_INTERVAL', 0.05)
+
+    @property
+    def l1(self):
+        return caches[self.l1_alias]
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l1_timeout(self, value, timeout=None):
+        """Return how long `value` may stay in L1"""
+        l1_timeout = self.l1_timeout
+        if timeout is not None:
+            l1_timeout = min(l1_timeout, timeout)
+        if isinstance(value, Entry) and value.expires is not None:
+            l1_timeout = min(l1_timeout, value.expires - time.time())
+        return max(l1_timeout, 0)
+
+    def _get_raw(self, key, version):
+        value = self.l1.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            value = self.l2.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self.l1.set(
+                    key, value, self._l1_timeout(value), version=version,
+                )
+        return value
+
+    def get(self, key, default=None, version=None):
+        value = self._get_raw(key, version)
+        return default if value is _MISSING else unwrap(value)
+
+    def get_many(self, keys, version=None):
+        found = self.l1.get_many(keys, version=version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.l2.get_many(missing, version=version)
+            for key, value in shared.items():
+                self.l1.set(
+                    key, value, self._l1_timeout(value), version=version,
+                )
+            found.update(shared)
+        return {key: unwrap(value) for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self.l2.set(key, value, timeout, version=version)
+        self.l1.set(
+            key, value, self._l1_timeout(value, timeout), version=version,
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            self.l1.set(
+                key, value, self._l1_timeout(value, timeout),
+                version=version,
+            )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self.l1.set(
+                key, value, self._l1_timeout(value, timeout),
+                version=version,
+            )
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.touch(key, self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.l1.delete_many(keys, version=version)
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return (
+            self.l1.has_key(key, version=version)  # noqa: W601
+            or self.l2.has_key(key, version=version)  # noqa: W601
+        )
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    @contextmanager
+    def _single_flight(self, key):
+        """Let one thread of this process at a time compute `key`"""
+        with self._flights_lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                yield
+        finally:
+            with self._flights_lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[key]
+
+    def _wait_for(self, key, version):
+        """Wait for another process to store `key`, _MISSING on time out"""
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.l2.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+        return _MISSING
+
+    def _fresh(self, value):
+        return value is not _MISSING and not (
+            isinstance(value, Entry) and value.refresh_early(self.beta)
+        )
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self._get_raw(key, version)
+        if self._fresh(value):
+            return unwrap(value)
+
+        timeout = self._timeout(timeout)
+        with self._single_flight(f'{self.l2_alias}:{version}:{key}'):
+            # Another thread may have stored it while this one waited
+            value = self.l1.get(key, _MISSING, version=version)
+            if self._fresh(value):
+                return unwrap(value)
+
+            lock_key = f'{key}:computing'
+            locked = self.l2.add(
+                lock_key, 1, self.lock_timeout, version=version,
+            )
+            if not locked:
+                # Another process is computing it: serve the old value
+                # while it does, or wait for the new one.
+                if value is _MISSING:
+                    value = self._wait_for(key, version)
+                if value is not _MISSING:
+                    return unwrap(value)
+
+            try:
+                start = time.monotonic()
+                result = default() if callable(default) else default
+                expires = None if timeout is None else time.time() + timeout
+                self.set(
+                    key,
+                    Entry(result, time.monotonic() - start, expires),
+                    timeout,
+                    version=version,
+                )
+            finally:
+                if locked:
+                    self.l2.delete(lock_key, version=version)
+        return result
+
+
+def get_tiered_cache():
+    """Return the two level cache"""
+    return caches['tiered']
+
+
+class Namespace:
+    """
+    Keys invalidated together by bumping the namespace's version.
+
+        recipes = Namespace(f'recipes:{user.id}')
+        cache.get_or_set(recipes.key('list'), build_list)
+        recipes.invalidate()  # Every key built before is now unused
+
+    Old keys are never deleted, they expire with their timeout. With the
+    two level cache other processes see a new version within L1_TIMEOUT.
+    """
+
+    def __init__(self, name, cache=None):
+        self.name = name
+        self.cache = cache or get_tiered_cache()
+        self.version_key = f'ns:{name}'
+
+    def version(self):
+        """Return the current version, starting the namespace if needed"""
+        version = self.cache.get(self.version_key)
+        if version is None:
+            # Start from the clock so a namespace whose version key was
+            # evicted does not reuse old versions.
+            self.cache.add(self.version_key, time.time_ns() // 1000, None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def key(self, key):
+        """Return `key` inside the namespace"""
+        return f'{self.name}:{self.version()}:{key}'
+
+    def invalidate(self):
+        """Make every key built so far unused"""
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            pass  # No version yet, so no keys to invalidate either
@@ -0,0 +1,49 @@
+"""
+Conditional GET support for API views
+"""
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Return a quoted ETag built from the given parts"""
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since from cheap validators.
+
+    Views implement `get_validators` returning an (etag, last_modified)
+    pair computed without building the response body, and route handlers
+    through `conditional` so a 304 is returned before the handler runs.
+    """
+
+    def get_validators(self):
+        """Return the (etag, last_modified) validators for the request"""
+        return None, None
+
+    def conditional(self, handler, request, *args, **kwargs):
+        """Call `handler` unless the client's cached copy is still fresh"""
+        etag, last_modified = self.get_validators()
+        timestamp = last_modified and timegm(last_modified.utctimetuple())
+        if etag or timestamp:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp,
+            )
+            if response is not None:
+                return response
+
+        response = handler(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            if etag:
+                response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
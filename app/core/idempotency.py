@@ -0,0 +1,145 @@
+"""
+Idempotency-Key support for unsafe API actions
+"""
+import functools
+import hashlib
+import json
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import status
+from rest_framework.response import Response
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    name=HEADER,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    description=(
+        'Unique key for this request. Retrying with the same key returns '
+        'the first response instead of repeating the action.'
+    ),
+    required=False,
+)
+
+
+def request_fingerprint(request):
+    """Return a hash of the method, path and payload of `request`"""
+    digest = hashlib.sha256(f'{request.method} {request.path}'.encode())
+    files = request.FILES
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = {k: v for k, v in data.lists() if k not in files}
+    digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+    for name in sorted(files):
+        for upload in files.getlist(name):
+            digest.update(name.encode())
+            for chunk in upload.chunks():
+                digest.update(chunk)
+            upload.seek(0)
+    return digest.hexdigest()
+
+
+# Deletes KEYS[1] only while it still holds the token ARGV[1]
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def release(lock_key, token):
+    """
+    Delete the lock taken with `token` unless it expired and another
+    request took it since
+    """
+    client = getattr(cache, 'client', None)
+    if hasattr(client, 'get_client'):  # django-redis: compare-and-delete
+        client.get_client(write=True).eval(
+            RELEASE_SCRIPT, 1, client.make_key(lock_key), client.encode(token),
+        )
+    elif cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def replay(stored):
+    """Rebuild the stored response"""
+    response = Response(stored['data'], status=stored['status'])
+    for header, value in stored['headers'].items():
+        response[header] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Let clients retry the decorated action safely with an Idempotency-Key.
+
+    The first response for a user and key is stored for
+    IDEMPOTENCY_KEY_TTL seconds and returned again for retries without
+    running the action. A retry arriving while the first request is still
+    running waits for its response. Reusing a key for a different request
+    is rejected with 422.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} is longer than {MAX_KEY_LENGTH}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        key_hash = hashlib.sha256(key.encode()).hexdigest()
+        cache_key = f'idempotency:{request.user.pk}:{key_hash}'
+        lock_key = f'{cache_key}:lock'
+        token = secrets.token_hex(16)
+        fingerprint = request_fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                break
+            if cache.add(lock_key, token, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                try:
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code < 500:
+                        cache.set(cache_key, {
+                            'fingerprint': fingerprint,
+                            'status': response.status_code,
+                            'data': response.data,
+                            'headers': {
+                                header: response[header]
+                                for header in ('Location',)
+                                if response.has_header(header)
+                            },
+                        }, settings.IDEMPOTENCY_KEY_TTL)
+                finally:
+                    release(lock_key, token)
+                return response
+            if time.monotonic() > deadline:
+                return Response(
+                    {'detail': f'A request with this {HEADER} is still '
+                               'in progress.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+        if stored['fingerprint'] != fingerprint:
+            return Response(
+                {'detail': f'{HEADER} was already used for a different '
+                           'request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return replay(stored)
+    return wrapper
@@ -0,0 +1,64 @@
+"""
+Validation of uploaded images with bounded memory use
+
+Pillow only parses the header when an image is opened, so the format and
+dimensions are checked before any pixel is decoded: a file of a few
+kilobytes can claim dimensions whose decoded pixels would need gigabytes
+(a decompression bomb). Files are then checked for truncated or corrupt
+data without decoding them at full size: JPEGs are decoded in draft mode
+at 1/8 scale while other formats are only verified (for PNGs, their
+chunk checksums), so the memory needed to validate an upload stays below
+IMAGE_UPLOAD_MAX_PIXELS bytes whatever the file holds.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+
+def too_many_pixels():
+    return ValidationError(
+        'Images can have at most %(max)s pixels.',
+        code='image_too_many_pixels',
+        params={'max': settings.IMAGE_UPLOAD_MAX_PIXELS},
+    )
+
+
+def validate_image(file):
+    """Check the size, format and dimensions of an uploaded image"""
+    if file.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise ValidationError(
+            'Images can be at most %(max)s.',
+            code='image_too_large',
+            params={'max': filesizeformat(settings.IMAGE_UPLOAD_MAX_BYTES)},
+        )
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValidationError(
+                    'Unsupported image format %(format)s.',
+                    code='image_format',
+                    params={'format': image.format},
+                )
+            if image.width * image.height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+                raise too_many_pixels()
+            if image.format == 'JPEG':
+                image.draft(image.mode, (
+                    max(image.width // 8, 1), max(image.height // 8, 1),
+                ))
+                image.load()
+            else:
+                image.verify()
+    except Image.DecompressionBombError:  # Far over the limit
+        raise too_many_pixels()
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError(
+            'Upload a valid image. The file was truncated or corrupt.',
+            code='invalid_image',
+        )
+    finally:
+        file.seek(0)
@@ -0,0 +1,150 @@
+"""
+Background jobs stored in the database and run by `manage.py run_worker`
+
+Register a handler with the `job` decorator in an app's `jobs` module and
+queue work with `enqueue`:
+
+    @job('recipe.import')
+    def import_recipes(job, url):
+        ...
+
+    enqueue('recipe.import', user=request.user, url=url)
+
+Handlers receive the Job row first and its kwargs as keyword arguments;
+their return value must be JSON serializable and is stored as the result.
+A job still running JOB_LOCK_TIMEOUT seconds after it was claimed, or
+after it last reported progress, is queued again.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+registry = {}  # job name -> handler
+
+
+def job(name, max_attempts=3):
+    """Register the decorated function as the handler of job `name`"""
+    def decorator(func):
+        func.job_name = name
+        func.max_attempts = max_attempts
+        registry[name] = func
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Import the `jobs` module of every installed app"""
+    autodiscover_modules('jobs')
+
+
+def enqueue(name, user=None, run_at=None, **kwargs):
+    """Queue job `name` with `kwargs` and return it"""
+    if name not in registry:
+        raise ValueError(f'Unknown job {name!r}')
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        user=user,
+        run_at=run_at or timezone.now(),
+        max_attempts=registry[name].max_attempts,
+    )
+
+
+def retry_delay(attempts):
+    """Return how long to wait before the next attempt"""
+    return timedelta(seconds=min(
+        settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.JOB_RETRY_BACKOFF_MAX,
+    ))
+
+
+def requeue_stale():
+    """Queue again jobs whose worker died while running them"""
+    stale = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=stale,
+    ).update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def claim(worker_id):
+    """Lock the oldest due job for `worker_id`, None if there is none"""
+    now = timezone.now()
+    with transaction.atomic():
+        # SKIP LOCKED lets concurrent workers claim different rows
+        # without waiting on each other.
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED, run_at__lte=now,
+        ).order_by('run_at').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.save(update_fields=[
+            'status', 'attempts', 'locked_by', 'locked_at', 'updated_at',
+        ])
+    return job
+
+
+def run(job):
+    """
+    Run a claimed job and record its outcome, unless the job was queued
+    again in the meantime
+    """
+    worker_id = job.locked_by
+    try:
+        handler = registry[job.name]
+        result = handler(job, **job.kwargs)
+        # Fail the job here rather than when saving the result
+        json.dumps(result, cls=Job._meta.get_field('result').encoder)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.exception('Job %s failed', job)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+            logger.warning('Job %s failed, retrying at %s', job, job.run_at)
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+    job.locked_by = ''
+    job.locked_at = None
+    job.updated_at = timezone.now()
+    finished = Job.objects.filter(pk=job.pk, locked_by=worker_id).update(
+        status=job.status,
+        result=job.result,
+        last_error=job.last_error,
+        run_at=job.run_at,
+        locked_by='',
+        locked_at=None,
+        updated_at=job.updated_at,
+    )
+    if not finished:
+        logger.warning('Job %s was queued again while running', job)
+    return job
+
+
+def set_progress(job, **progress):
+    """
+    Store progress of a running job for the status endpoint, which also
+    keeps the job from being queued again as stale
+    """
+    job.progress = progress
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        progress=progress, locked_at=now, updated_at=now,
+    )
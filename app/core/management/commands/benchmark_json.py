@@ -0,0 +1,74 @@
+"""
+Django command to benchmark the JSON renderers and parsers
+"""
+import io
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer, orjson
+
+
+def sample_recipes(count):
+    """Return `count` serialized recipes shaped like RecipeSerializer output"""
+    return [
+        {
+            'id': i,
+            'title': f'Sample recipe {i}',
+            'time_minutes': 10 + i % 50,
+            'price': Decimal('5.50') + i,
+            'link': f'https://example.com/recipes/{i}.pdf',
+            'tags': [
+                {'id': i * 3 + t, 'name': f'Tag {t}'} for t in range(3)
+            ],
+            'ingredients': [
+                {'id': i * 5 + n, 'name': f'Ingredient {n}'} for n in range(5)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the JSON renderers and parsers"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, ORJSON* classes use the fallback'
+            ))
+        data = sample_recipes(options['recipes'])
+        payload = JSONRenderer().render(data)
+        repeat = options['repeat']
+        self.stdout.write(
+            f'{options["recipes"]} recipes, {len(payload)} bytes, '
+            f'best of {repeat} runs'
+        )
+
+        for name, renderer in (
+            ('JSONRenderer', JSONRenderer()),
+            ('ORJSONRenderer', ORJSONRenderer()),
+        ):
+            best = min(timeit.repeat(
+                lambda: renderer.render(data), number=1, repeat=repeat,
+            ))
+            self.stdout.write(f'  render {name:<16} {best * 1000:8.2f} ms')
+
+        for name, parser in (
+            ('JSONParser', JSONParser()),
+            ('ORJSONParser', ORJSONParser()),
+        ):
+            best = min(timeit.repeat(
+                lambda: parser.parse(io.BytesIO(payload)),
+                number=1, repeat=repeat,
+            ))
+            self.stdout.write(f'  parse  {name:<16} {best * 1000:8.2f} ms')
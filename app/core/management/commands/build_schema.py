@@ -0,0 +1,37 @@
+"""
+Django command to build the OpenAPI schema artifacts
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+
+from core.schema import artifact_path, code_fingerprint, generate_schema
+
+
+class Command(BaseCommand):
+    """Django command to build the OpenAPI schema artifacts"""
+    help = (
+        'Write the YAML and JSON schema for the current code to '
+        'SCHEMA_ROOT so the schema view does not generate it at runtime.'
+    )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        root = Path(settings.SCHEMA_ROOT)
+        root.mkdir(parents=True, exist_ok=True)
+        current = set()
+        for renderer in (OpenApiYamlRenderer(), OpenApiJsonRenderer()):
+            path = artifact_path(renderer)
+            path.write_bytes(generate_schema(renderer))
+            current.add(path)
+            self.stdout.write(f'Wrote {path}')
+
+        for path in root.glob('schema-*'):
+            if path not in current:
+                path.unlink()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Schema {code_fingerprint()} built'
+        ))
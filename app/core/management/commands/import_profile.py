@@ -0,0 +1,91 @@
+"""
+Django command to profile worker start up imports
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Imports everything a preloaded uWSGI worker imports, then reports the
+# wall time and peak RSS of the interpreter.
+WORKER_SCRIPT = """
+import resource, time
+start = time.perf_counter()
+import app.wsgi
+print(time.perf_counter() - start)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def parse_importtime(output):
+    """Return (module, self_us, cumulative_us) rows from -X importtime"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split(
+            '|'
+        )
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize_by_package(rows):
+    """Return total self time per top-level package, largest first"""
+    totals = defaultdict(int)
+    for module, self_us, _ in rows:
+        totals[module.split('.')[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+class Command(BaseCommand):
+    """Django command to profile worker start up imports"""
+    help = (
+        'Start a fresh interpreter per settings profile with -X importtime '
+        'and summarize import time and memory of a worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            help='APP_PROFILE to measure, repeatable (default: api and full)',
+        )
+        parser.add_argument('--top', type=int, default=15)
+
+    def measure(self, profile):
+        """Return (rows, seconds, maxrss_kb) for a worker of `profile`"""
+        env = dict(
+            os.environ,
+            APP_PROFILE=profile,
+            WSGI_PRELOAD='1',
+        )
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER_SCRIPT],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        seconds, maxrss = result.stdout.split()
+        return parse_importtime(result.stderr), float(seconds), int(maxrss)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        for profile in options['profiles'] or ['api', 'full']:
+            rows, seconds, maxrss = self.measure(profile)
+            total_ms = sum(self_us for _, self_us, _ in rows) / 1000
+            self.stdout.write(self.style.SUCCESS(
+                f'Profile {profile}: {len(rows)} modules, '
+                f'{total_ms:.0f} ms importing, {seconds * 1000:.0f} ms '
+                f'to load app.wsgi, {maxrss / 1024:.1f} MB peak RSS'
+            ))
+            for package, self_us in summarize_by_package(rows)[
+                :options['top']
+            ]:
+                self.stdout.write(f'  {self_us / 1000:8.1f} ms  {package}')
@@ -0,0 +1,56 @@
+"""
+Django command to delete a user and all their data
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import jobs
+from core.purge import purge_user
+
+
+class Command(BaseCommand):
+    """Django command to delete a user and all their data"""
+    help = (
+        'Delete a user with their recipes, tags, ingredients, tokens and '
+        'recipe images in chunks, or queue a job doing so.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help='Email address or ID of the user')
+        parser.add_argument(
+            '--chunk-size', type=int,
+            help='Rows deleted per statement (default: BULK_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--async', action='store_true', dest='run_async',
+            help='Queue a user.purge job for the worker instead',
+        )
+
+    def get_user(self, value):
+        User = get_user_model()
+        lookup = {'pk': value} if value.isdigit() else {'email': value}
+        try:
+            return User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'No user {value!r}')
+
+    def progress(self, stage, deleted):
+        counts = ', '.join(f'{kind} {n}' for kind, n in deleted.items() if n)
+        self.stdout.write(f'{stage}: {counts or "nothing"} deleted')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        user = self.get_user(options['user'])
+        if options['run_async']:
+            jobs.autodiscover()
+            job = jobs.enqueue(
+                'user.purge', user_id=user.pk,
+                chunk_size=options['chunk_size'],
+            )
+            self.stdout.write(f'Queued {job}')
+            return
+        purge_user(
+            user.pk, chunk_size=options['chunk_size'],
+            progress=self.progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {user.email}'))
@@ -0,0 +1,47 @@
+"""
+Django command to rebuild the recipe similarity signatures
+"""
+from django.core.management.base import BaseCommand
+
+from core import similarity
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the recipe similarity signatures"""
+    help = (
+        'Recompute the MinHash signatures and LSH buckets of every recipe, '
+        'or of one user\'s recipes, in batches computed with NumPy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only this user ID')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Recipes computed and written per batch',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if similarity.numpy is None:
+            self.stderr.write('NumPy is not installed, using pure Python')
+        recipes = Recipe.objects.order_by('id')
+        if options['user']:
+            recipes = recipes.filter(user_id=options['user'])
+
+        done = 0
+        last_id = 0
+        while True:
+            users = dict(recipes.filter(id__gt=last_id).values_list(
+                'id', 'user_id',
+            )[:options['chunk_size']])
+            if not users:
+                break
+            signatures = similarity.minhash_many(
+                similarity.feature_sets(users)
+            )
+            similarity.save_signatures(signatures, users)
+            done += len(users)
+            last_id = max(users)
+            self.stdout.write(f'{done} recipes')
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {done} recipes'))
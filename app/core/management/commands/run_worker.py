@@ -0,0 +1,108 @@
+"""
+Django command to run background jobs
+"""
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core import jobs
+from core.routers import pin_to_primary
+
+
+class Command(BaseCommand):
+    """Django command to run background jobs"""
+    help = (
+        'Claim queued jobs from the database and run them with a pool of '
+        'worker threads.'
+    )
+    # Seconds between checks for jobs of workers that died
+    requeue_interval = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of jobs run at the same time',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1,
+            help='Seconds to wait when no job is due',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no job is due instead of polling',
+        )
+
+    def requeue_stale(self):
+        """Queue again the jobs of workers that died"""
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Queued {requeued} stale jobs again')
+
+    def work(self, worker_id, options):
+        """Claim and run jobs until stopped"""
+        # Jobs read what the request that queued them just wrote
+        pin_to_primary()
+        next_requeue = 0
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                if time.monotonic() >= next_requeue:
+                    next_requeue = time.monotonic() + self.requeue_interval
+                    self.requeue_stale()
+                job = jobs.claim(worker_id)
+                if job is None:
+                    if options['once']:
+                        return
+                    self.stopping.wait(options['poll_interval'])
+                    continue
+                jobs.run(job)
+                self.stdout.write(f'{worker_id}: {job}')
+        finally:
+            pin_to_primary(False)
+            connection.close()
+
+    def stop(self, signum, frame):
+        """Finish the running jobs, then exit"""
+        self.stdout.write('Stopping after the running jobs finish...')
+        self.stopping.set()
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        jobs.autodiscover()
+        self.stopping = threading.Event()
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                handlers[signum] = signal.signal(signum, self.stop)
+        try:
+            self.run_workers(options)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run_workers(self, options):
+        """Run `concurrency` workers until they stop"""
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        concurrency = max(options['concurrency'], 1)
+        start = time.monotonic()
+        if concurrency == 1:
+            self.work(f'{prefix}:0', options)
+        else:
+            threads = [
+                threading.Thread(
+                    target=self.work, args=(f'{prefix}:{i}', options),
+                )
+                for i in range(concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker stopped after {time.monotonic() - start:.1f}s'
+        ))
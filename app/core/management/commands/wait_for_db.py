@@ -1,25 +1,113 @@
 """
 Django command to pause execution until database is available
 """
+import random
 import time
-from psycopg2 import OperationalError as Psycopg2Error
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from psycopg2 import OperationalError as Psycopg2Error
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
+    help = (
+        'Wait until every database (and optionally cache) accepts '
+        'connections, retrying with exponential backoff.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Database alias to wait for, repeatable (default: all)',
+        )
+        parser.add_argument(
+            '--cache', action='append', dest='caches', default=[],
+            help='Cache alias to wait for, repeatable',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=120,
+            help='Give up after this many seconds',
+        )
+        parser.add_argument('--initial-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5)
+
+    def probe_database(self, alias):
+        """Open a raw connection to the database and run a trivial query"""
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            connection.close()
+
+    def probe_cache(self, alias):
+        """Round trip a key through the cache"""
+        cache = caches[alias]
+        cache.set('wait_for_db', 1, 5)
+        cache.get('wait_for_db')
+
+    def wait_for(self, name, probe, errors, deadline, options):
+        """Call `probe` until it succeeds, returning the time it took"""
+        start = time.monotonic()
+        delay = options['initial_delay']
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                probe()
+                return time.monotonic() - start
+            except errors:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'{name} unavailable after {attempts} attempts'
+                    )
+                # Jitter keeps many containers from retrying in lockstep
+                sleep = min(delay * random.uniform(0.5, 1), remaining)
+                self.stdout.write(
+                    f'{name} unavailable, waiting {sleep:.2f} seconds...'
+                )
+                time.sleep(sleep)
+                delay = min(delay * 2, options['max_delay'])
 
     def handle(self, *args, **options):
         """Handle the command"""
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while not db_up:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        targets = [
+            (
+                f'Database {alias}',
+                lambda alias=alias: self.probe_database(alias),
+                (Psycopg2Error, OperationalError),
+            )
+            for alias in options['databases'] or list(settings.DATABASES)
+        ] + [
+            (
+                f'Cache {alias}',
+                lambda alias=alias: self.probe_cache(alias),
+                Exception,
+            )
+            for alias in options['caches']
+        ]
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            futures = [
+                (name, executor.submit(
+                    self.wait_for, name, probe, errors, deadline, options,
+                ))
+                for name, probe, errors in targets
+            ]
+            for name, future in futures:
+                self.stdout.write(
+                    f'{name} ready in {future.result():.2f} seconds'
+                )
 
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available! ({time.monotonic() - start:.2f} seconds)'
+        ))
@@ -0,0 +1,144 @@
+"""
+Core middleware
+"""
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import FileResponse
+
+from core import jobs, querylog
+from core.routers import pin_to_primary
+
+
+logger = logging.getLogger(__name__)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinMiddleware:
+    """
+    Give clients read-your-writes consistency with read replicas.
+
+    Unsafe requests run against the primary and answer with a short-lived
+    pin, sent as a cookie and an X-DB-Pin header holding a UNIX timestamp.
+    Reads carrying an unexpired pin (cookie or echoed header) also use the
+    primary so they see the write even when replicas lag behind.
+    """
+    cookie_name = 'db_pin'
+    header_name = 'X-DB-Pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _pinned_until(self, request):
+        """Return the pin expiry sent by the client, 0 if none"""
+        value = request.COOKIES.get(self.cookie_name) or request.headers.get(
+            self.header_name
+        )
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+
+    def __call__(self, request):
+        now = time.time()
+        max_pin = now + settings.DATABASE_PIN_SECONDS
+        # The pin is left in place after the response so streamed bodies
+        # read from the same database; every request resets it here.
+        pin_to_primary(
+            request.method not in SAFE_METHODS
+            or now < self._pinned_until(request) <= max_pin
+        )
+
+        response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            until = str(int(max_pin))
+            response.set_cookie(
+                self.cookie_name,
+                until,
+                max_age=settings.DATABASE_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+            response[self.header_name] = until
+        return response
+
+
+class QueryLogMiddleware:
+    """
+    Log slow SQL statements and trace the SQL of requests.
+
+    See core.querylog. Staff users get the trace of a request by sending
+    an X-SQL-Trace: 1 header; its totals come back in a Server-Timing
+    header, except for streamed responses. The header of other users is
+    ignored.
+    """
+    header_name = 'X-SQL-Trace'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = getattr(request, '_query_trace', None)
+        if trace is None:
+            return
+        view = getattr(view_func, 'cls', view_func)
+        trace.view = f'{view.__module__}.{view.__qualname__}'
+        # Viewsets map the method to the action, e.g. get -> list
+        actions = getattr(view_func, 'actions', None) or {}
+        trace.action = actions.get(request.method.lower(), '')
+
+    def __call__(self, request):
+        requested = request.headers.get(self.header_name) == '1'
+        sampled = random.random() < settings.SQL_TRACE_SAMPLE_RATE
+        trace = querylog.QueryTrace(request, traced=requested or sampled)
+        request._query_trace = trace
+
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(trace))
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+
+        if response.streaming and not isinstance(response, FileResponse):
+            # The body runs its queries as it is sent (files run none), so
+            # keep tracing until the server closes the response. Its headers
+            # are sent by then, so there is no Server-Timing header.
+            def finish():
+                stack.close()
+                self.record(request, trace, sampled, requested)
+            response._resource_closers.append(finish)
+            return response
+
+        stack.close()
+        if self.record(request, trace, sampled, requested):
+            total = sum(duration for _, duration in trace.queries)
+            response['Server-Timing'] = (
+                f'db;desc="{len(trace.queries)} queries";'
+                f'dur={total * 1000:.1f}'
+            )
+        return response
+
+    def record(self, request, trace, sampled, requested):
+        """Queue recording the trace; return whether staff requested it"""
+        # Authenticated by now, so checking the user runs outside the trace
+        user = getattr(request, 'user', None)
+        requested = requested and getattr(user, 'is_staff', False)
+        if trace.queries and (sampled or requested):
+            try:
+                jobs.enqueue(
+                    'core.record_sql_trace', endpoint=trace.endpoint,
+                    statements=querylog.summarize(trace.queries),
+                )
+            except DatabaseError:
+                logger.exception('Could not record the SQL trace')
+        return requested
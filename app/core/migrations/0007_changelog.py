@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user', 'id'], name='core_change_user_id_ee010b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user', 'kind', 'object_id'], name='core_change_user_id_2eee94_idx'),
+        ),
+        # Seed the log with existing rows so a sync from token 0 is complete
+        migrations.RunSQL(
+            sql=[
+                f"INSERT INTO core_changelog "
+                f"(user_id, kind, object_id, deleted, changed_at) "
+                f"SELECT user_id, '{kind}', id, false, CURRENT_TIMESTAMP "
+                f"FROM {table} ORDER BY id"
+                for kind, table in (
+                    ('tag', 'core_tag'),
+                    ('ingredient', 'core_ingredient'),
+                    ('recipe', 'core_recipe'),
+                )
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
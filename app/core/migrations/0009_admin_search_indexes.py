@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:40
+
+from django.db import migrations
+
+
+# Admin searches compile to UPPER(column::text) LIKE 'X%' (prefix search)
+# and UPPER(column::text) = 'X' (exact search); these indexes match them.
+INDEXES = (
+    ('core_recipe_title_upper_idx', 'core_recipe',
+     'UPPER(title::text) text_pattern_ops'),
+    ('core_tag_name_upper_idx', 'core_tag',
+     'UPPER(name::text) text_pattern_ops'),
+    ('core_ingredient_name_upper_idx', 'core_ingredient',
+     'UPPER(name::text) text_pattern_ops'),
+    ('core_user_email_upper_idx', 'core_user', 'UPPER(email::text)'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    """Build the indexes without locking writes, on Postgres only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} ({expression})'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
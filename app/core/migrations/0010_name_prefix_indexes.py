@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:05
+
+from django.db import migrations
+
+
+# Autocomplete filters on user_id = X AND LOWER(name) LIKE 'x%';
+# text_pattern_ops lets the LIKE prefix use the index whatever the
+# database collation.
+INDEXES = (
+    ('core_tag_user_name_lower_idx', 'core_tag'),
+    ('core_ingredient_user_name_lower_idx', 'core_ingredient'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    """Build the indexes without locking writes, on Postgres only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} (user_id, LOWER(name) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
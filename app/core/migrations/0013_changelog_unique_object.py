@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_query_fingerprint'),
+    ]
+
+    operations = [
+        # Keep the latest entry of objects logged twice by concurrent writers
+        migrations.RunSQL(
+            sql=(
+                'DELETE FROM core_changelog WHERE id NOT IN ('
+                'SELECT MAX(id) FROM core_changelog '
+                'GROUP BY user_id, kind, object_id)'
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='core_change_user_id_2eee94_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='changelog',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'object_id'), name='core_changelog_unique_object'),
+        ),
+    ]
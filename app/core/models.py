@@ -5,6 +5,7 @@ import os
 import uuid
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (AbstractBaseUser,
                                         BaseUserManager,
                                         PermissionsMixin)
@@ -73,6 +74,9 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped when tags or ingredients change, see core.signals
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -85,6 +89,7 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -97,6 +102,166 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
+
+
+class ChangeLog(models.Model):
+    """
+    Per-user log of recipe, tag and ingredient changes used for delta sync.
+
+    Each object has at most one entry; a change replaces the previous entry
+    so the auto-increment ID is a monotonic change token. Writes to a
+    user's log are serialized until they commit (see core.signals), so the
+    IDs of a user's entries also follow commit order.
+    """
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KIND_CHOICES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)  # Tombstone
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'object_id'],
+                name='core_changelog_unique_object',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class Job(models.Model):
+    """Background job run by the `run_worker` command, see core.jobs"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+    )
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due queued job
+            models.Index(
+                fields=['run_at'],
+                name='core_job_queued_idx',
+                condition=models.Q(status='queued'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+
+class RecipeSignature(models.Model):
+    """MinHash signature of a recipe's tags and ingredients"""
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='signature',
+    )
+    minhash = models.JSONField(default=list)  # Empty without features
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Signature of recipe {self.recipe_id}'
+
+
+class RecipeBand(models.Model):
+    """
+    Locality sensitive hashing bucket of a recipe, see core.similarity.
+
+    Recipes sharing a bucket in any band are candidates for similarity.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'band', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} band {self.band}'
+
+
+class QueryFingerprint(models.Model):
+    """
+    Time spent on one shape of SQL statement by a view, see core.querylog.
+
+    Statements differing only in their parameters share a fingerprint.
+    """
+    fingerprint = models.CharField(max_length=32)
+    view = models.CharField(max_length=255)
+    statement = models.TextField()
+    count = models.PositiveBigIntegerField(default=0)
+    total_time = models.FloatField(default=0)  # Seconds
+    max_time = models.FloatField(default=0)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fingerprint', 'view'],
+                name='core_queryfingerprint_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.fingerprint} in {self.view}'
@@ -0,0 +1,133 @@
+"""
+Deleting a user and everything they own in bounded chunks
+
+`User.delete()` has Django's collector load every dependent row first,
+which for a user with many recipes takes minutes and a lot of memory.
+`purge_user` deletes in dependency order instead, one statement per table
+and chunk of IDs, each chunk in its own transaction, and removes recipe
+images and their thumbnails once no recipe refers to them. It can be
+stopped and run again: every pass only looks at rows that still exist.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from core.authentication import forget_tokens
+from core.models import (
+    ChangeLog,
+    Job,
+    Recipe,
+    RecipeBand,
+    RecipeSignature,
+    Tag,
+    Ingredient,
+)
+from core.thumbnails import ThumbnailCache
+
+
+def _chunks(queryset, fields, size):
+    """Yield lists of at most `size` rows until `queryset` is empty"""
+    while True:
+        rows = list(queryset.order_by('pk').values_list(*fields)[:size])
+        if not rows:
+            return
+        yield rows
+
+
+def _raw_delete(queryset):
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_unused_images(names):
+    """Delete the images in `names` no recipe refers to, return how many"""
+    # Copies of a recipe share its image file
+    names = set(filter(None, names))
+    names -= set(Recipe.objects.filter(
+        image__in=names,
+    ).values_list('image', flat=True))
+    storage = Recipe._meta.get_field('image').storage
+    thumbnails = ThumbnailCache()
+    for name in names:
+        storage.delete(name)
+        thumbnails.delete(name)
+    return len(names)
+
+
+def purge_user(user_id, chunk_size=None, progress=None):
+    """
+    Delete user `user_id` and their data, return the rows deleted per kind.
+
+    `progress(stage, deleted)` is called after every chunk with the name of
+    the table being emptied and the counts so far.
+    """
+    chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+    deleted = dict.fromkeys(
+        ('tokens', 'links', 'recipes', 'images', 'tags', 'ingredients',
+         'changes'),
+        0,
+    )
+
+    def report(stage):
+        if progress is not None:
+            progress(stage, dict(deleted))
+
+    # Sign the user out first so nothing new is written meanwhile
+    User = get_user_model()
+    User.objects.filter(pk=user_id).update(is_active=False)
+    keys = list(Token.objects.filter(user_id=user_id).values_list(
+        'key', flat=True,
+    ))
+    deleted['tokens'] = _raw_delete(Token.objects.filter(key__in=keys))
+    forget_tokens(keys)
+    report('tokens')
+
+    recipes = Recipe.objects.filter(user_id=user_id)
+    for rows in _chunks(recipes, ('id', 'image'), chunk_size):
+        ids = [pk for pk, _ in rows]
+        with transaction.atomic():
+            for through in (Recipe.tags.through, Recipe.ingredients.through):
+                deleted['links'] += _raw_delete(
+                    through.objects.filter(recipe_id__in=ids)
+                )
+            for related in (RecipeBand, RecipeSignature):
+                _raw_delete(related.objects.filter(recipe_id__in=ids))
+            deleted['recipes'] += _raw_delete(Recipe.objects.filter(
+                id__in=ids,
+            ))
+        deleted['images'] += delete_unused_images(
+            image for _, image in rows
+        )
+        report('recipes')
+
+    for model, through, column, kind in (
+        (Tag, Recipe.tags.through, 'tag_id', 'tags'),
+        (Ingredient, Recipe.ingredients.through, 'ingredient_id',
+         'ingredients'),
+    ):
+        items = model.objects.filter(user_id=user_id)
+        for rows in _chunks(items, ('id',), chunk_size):
+            ids = [pk for pk, in rows]
+            with transaction.atomic():
+                # Links from other users' recipes, should any exist
+                deleted['links'] += _raw_delete(
+                    through.objects.filter(**{f'{column}__in': ids})
+                )
+                deleted[kind] += _raw_delete(model.objects.filter(
+                    id__in=ids,
+                ))
+            report(kind)
+
+    changes = ChangeLog.objects.filter(user_id=user_id)
+    for rows in _chunks(changes, ('id',), chunk_size):
+        deleted['changes'] += _raw_delete(ChangeLog.objects.filter(
+            id__in=[pk for pk, in rows],
+        ))
+        report('changes')
+
+    # What is left is small: the user row, their jobs and permissions.
+    # A job running this purge for the user keeps its row and result.
+    Job.objects.filter(user_id=user_id, status=Job.RUNNING).update(user=None)
+    User.objects.filter(pk=user_id).delete()
+    report('user')
+    return deleted
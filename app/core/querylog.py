@@ -0,0 +1,132 @@
+"""
+Slow query log and sampled SQL traces of requests
+
+QueryLogMiddleware runs every request with a `QueryTrace` installed on all
+database connections through `execute_wrapper`. Statements slower than
+SLOW_QUERY_MS are logged to the `core.sql` logger with the view, action
+and user that ran them.
+
+A request is traced in full when it is sampled (SQL_TRACE_SAMPLE_RATE) or
+when a staff user sends `X-SQL-Trace: 1`. The statements of a traced
+request are reduced to fingerprints, which ignore literals and parameter
+counts, and a `core.record_sql_trace` job adds their count and time to
+QueryFingerprint rows of the endpoint, listed in the admin, so requests
+only pay for queueing the job.
+
+Streamed responses run their queries while the body is sent, so the trace
+stays installed until the response is closed.
+"""
+import hashlib
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
+
+from core import jobs
+from core.models import QueryFingerprint
+
+
+logger = logging.getLogger('core.sql')
+
+_SPACES = re.compile(r'\s+')
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+# Parameter lists such as IN (%s, %s) and rows of multi-row inserts
+_LISTS = re.compile(r'\((?:%s|\?)(?:, ?(?:%s|\?))*\)')
+_ROWS = re.compile(r'\(\?\)(?:, ?\(\?\))+')
+
+
+def normalize(sql):
+    """Return `sql` with literals and parameter lists replaced by ?"""
+    sql = _SPACES.sub(' ', sql.strip())
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _LISTS.sub('(?)', sql)
+    return _ROWS.sub('(?)', sql)
+
+
+def fingerprint(statement):
+    """Return the fingerprint of a normalized statement"""
+    return hashlib.md5(statement.encode()).hexdigest()
+
+
+class QueryTrace:
+    """Execute wrapper timing the statements of a request"""
+
+    def __init__(self, request, traced=False):
+        self.request = request
+        self.traced = traced
+        self.view = '-'
+        self.action = ''
+        self.queries = []  # (sql, seconds) when traced
+
+    @property
+    def endpoint(self):
+        return f'{self.view}.{self.action}' if self.action else self.view
+
+    def user_id(self):
+        """Return the ID of the authenticated user, without querying"""
+        user = vars(self.request).get('user')
+        if isinstance(user, SimpleLazyObject):
+            # Set by AuthenticationMiddleware and loaded on first use
+            user = None if user._wrapped is empty else user._wrapped
+        return getattr(user, 'pk', None)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if self.traced:
+                self.queries.append((sql, duration))
+            if duration * 1000 >= settings.SLOW_QUERY_MS:
+                logger.warning(
+                    'Slow query (%.1f ms) in %s action=%s user=%s: %s',
+                    duration * 1000, self.view, self.action or '-',
+                    self.user_id(), sql,
+                )
+
+
+def summarize(queries):
+    """
+    Return the [statement, count, seconds, longest] of the fingerprints of
+    the (sql, seconds) of a traced request
+    """
+    totals = {}
+    for sql, duration in queries:
+        statement = normalize(sql)
+        count, total, longest = totals.get(statement, (0, 0, 0))
+        totals[statement] = (
+            count + 1, total + duration, max(longest, duration),
+        )
+    return [[statement, *counts] for statement, counts in totals.items()]
+
+
+@jobs.job('core.record_sql_trace')
+def record(job, endpoint, statements):
+    """Add the `summarize`d statements of a traced request to fingerprints"""
+    with transaction.atomic():
+        QueryFingerprint.objects.bulk_create([
+            QueryFingerprint(
+                fingerprint=fingerprint(statement), view=endpoint,
+                statement=statement,
+            )
+            for statement, *_ in statements
+        ], ignore_conflicts=True)
+        now = timezone.now()
+        for statement, count, total, longest in statements:
+            QueryFingerprint.objects.filter(
+                fingerprint=fingerprint(statement), view=endpoint,
+            ).update(
+                count=F('count') + count,
+                total_time=F('total_time') + total,
+                max_time=Greatest('max_time', Value(longest)),
+                last_seen=now,
+            )
@@ -0,0 +1,85 @@
+"""
+Renderers for the REST API
+"""
+import decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is missing
+    orjson = None
+
+
+class JSONEncoder(encoders.JSONEncoder):
+    """DRF's encoder, encoding decimals the same way with or without orjson"""
+
+    def default(self, obj):
+        if isinstance(obj, decimal.Decimal):
+            # Keep the precision of DecimalField values such as Recipe.price
+            if api_settings.COERCE_DECIMAL_TO_STRING:
+                return str(obj)
+            return float(obj)
+        # Lazy translations, querysets, generators, etc.
+        return super().default(obj)
+
+
+def _orjson_default(obj):
+    """Encode the types orjson does not handle natively"""
+    return JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Falls back to the stdlib based JSONRenderer when orjson is not installed
+    or when the output cannot be produced by orjson (indentation other than
+    two spaces, ASCII-only output).
+    """
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring"""
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if orjson is None or self.ensure_ascii or indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=_orjson_default, option=option)
+
+        # Match JSONRenderer which escapes \u2028 and \u2029 so the output
+        # stays a strict javascript subset.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """
+    Newline delimited JSON renderer.
+
+    Lists are rendered one item per line, anything else as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into newline delimited JSON"""
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+
+        return b''.join(
+            super(NDJSONRenderer, self).render(item) + b'\n' for item in data
+        )
@@ -0,0 +1,89 @@
+"""
+Database router sending reads to replicas
+"""
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+# Replication lag in seconds, 0 when the replica has replayed everything
+# it received from the primary.
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_local = threading.local()
+_lag_checks = {}  # alias -> (checked at, lag)
+
+
+def pin_to_primary(pinned=True):
+    """Send this thread's reads to the primary until unpinned"""
+    _local.pinned = pinned
+
+
+def is_pinned():
+    """Return True if this thread's reads go to the primary"""
+    return getattr(_local, 'pinned', False)
+
+
+def replica_lag(alias):
+    """Return the replication lag of a replica, cached for a few seconds"""
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked and now - checked[0] < settings.DATABASE_REPLICA_LAG_CHECK:
+        return checked[1]
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0] or 0)
+    except DatabaseError:
+        lag = math.inf  # Unreachable replicas are skipped until rechecked
+    _lag_checks[alias] = (now, lag)
+    return lag
+
+
+def available_replicas():
+    """Return the replicas within the allowed replication lag"""
+    return [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_lag(alias) <= settings.DATABASE_REPLICA_MAX_LAG
+    ]
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads to a random healthy replica and writes to the primary.
+
+    Reads fall back to the primary when no replica is configured or
+    within the allowed lag, and while the thread is pinned to the primary
+    (see core.middleware.PrimaryPinMiddleware).
+    """
+
+    def db_for_read(self, model, **hints):
+        """Return the database to read `model` from"""
+        if is_pinned():
+            return 'default'
+        replicas = available_replicas()
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        """Send every write to the primary"""
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Replicas hold the same data as the primary"""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only migrate the primary, replicas follow through replication"""
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,146 @@
+"""
+OpenAPI schema generated once per code version and served from memory
+"""
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+
+import drf_spectacular
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+
+_lock = threading.Lock()
+_fingerprint = None
+_artifacts = {}  # renderer format -> SchemaArtifact
+
+
+def code_fingerprint():
+    """
+    Return a hash of everything the schema is generated from.
+
+    Computed once per process from the project's Python sources, the
+    drf-spectacular version and settings, so the schema is only rebuilt
+    when the code changes.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256()
+        digest.update(drf_spectacular.__version__.encode())
+        digest.update(
+            repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode()
+        )
+        base_dir = Path(settings.BASE_DIR)
+        for path in sorted(base_dir.rglob('*.py')):
+            digest.update(str(path.relative_to(base_dir)).encode())
+            digest.update(path.read_bytes())
+        _fingerprint = digest.hexdigest()[:16]
+    return _fingerprint
+
+
+def artifact_path(renderer):
+    """Return the on-disk location of the schema for `renderer`"""
+    return Path(settings.SCHEMA_ROOT) / (
+        f'schema-{code_fingerprint()}.{renderer.format}'
+    )
+
+
+def generate_schema(renderer):
+    """Generate the public schema and render it with `renderer`"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return renderer.render(schema, renderer_context={})
+
+
+class SchemaArtifact:
+    """Rendered schema, its gzipped copy and validators"""
+
+    def __init__(self, content, renderer):
+        self.content = content
+        # mtime=0 keeps the compressed bytes, and so the ETag, stable
+        self.gzipped = gzip.compress(content, mtime=0)
+        self.etag = f'"{code_fingerprint()}-{renderer.format}"'
+        self.gzip_etag = f'"{code_fingerprint()}-{renderer.format}-gzip"'
+
+
+def get_schema_artifact(renderer):
+    """Return the schema for `renderer`, loading or building it once"""
+    artifact = _artifacts.get(renderer.format)
+    if artifact is not None:
+        return artifact
+
+    with _lock:
+        if renderer.format not in _artifacts:
+            path = artifact_path(renderer)
+            try:
+                content = path.read_bytes()
+            except OSError:
+                content = generate_schema(renderer)
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    path.write_bytes(content)
+                except OSError:
+                    pass  # Read-only image, keep it in memory only
+            _artifacts[renderer.format] = SchemaArtifact(content, renderer)
+    return _artifacts[renderer.format]
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Return whether an Accept-Encoding header value allows gzip: listed, or
+    covered by *, with a non-zero q-value
+    """
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, *params = (part.strip() for part in coding.split(';'))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0)) > 0
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    Serve the schema built at image build time or on the first request.
+
+    Responses carry an ETag and are gzipped when the client accepts it.
+    Requests for a specific language or version are generated as before.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if (
+            request.GET.get('lang')
+            or request.GET.get('version')
+            or self.api_version
+        ):
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        artifact = get_schema_artifact(renderer)
+        use_gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        etag = artifact.gzip_etag if use_gzip else artifact.etag
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                artifact.gzipped if use_gzip else artifact.content,
+                content_type=request.accepted_media_type,
+            )
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
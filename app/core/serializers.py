@@ -0,0 +1,58 @@
+"""
+Serializers for core APIs
+"""
+from django.conf import settings
+from rest_framework import serializers
+
+from core.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background job status"""
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'max_attempts', 'run_at',
+            'progress', 'result', 'last_error', 'created_at', 'updated_at',
+        )
+        read_only_fields = fields
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for one request of a batch"""
+    method = serializers.ChoiceField(
+        choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE'),
+    )
+    path = serializers.RegexField(r'^/api/', max_length=2048)
+    headers = serializers.DictField(
+        child=serializers.CharField(), required=False,
+    )
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of API requests"""
+    requests = BatchItemSerializer(many=True)
+
+    def validate_requests(self, value):
+        """Check the batch is not empty or too large"""
+        if not value:
+            raise serializers.ValidationError('No requests given.')
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests per batch.'
+            )
+        return value
+
+
+class BatchResultSerializer(serializers.Serializer):
+    """Serializer for the response to one request of a batch"""
+    status = serializers.IntegerField()
+    headers = serializers.DictField(child=serializers.CharField())
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    """Serializer for the responses to a batch"""
+    responses = BatchResultSerializer(many=True)
@@ -0,0 +1,200 @@
+"""
+Signal handlers keeping recipe timestamps, the change log and cached API
+tokens up to date
+"""
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.authentication import forget_tokens
+from core.caching import Namespace
+from core.models import Recipe, Tag, Ingredient, ChangeLog
+from core.similarity import signatures_changed
+
+
+_state = threading.local()
+
+ATTR_KINDS = {
+    Tag: ChangeLog.TAG,
+    Ingredient: ChangeLog.INGREDIENT,
+}
+
+
+def _deleting_users():
+    """Return the IDs of users whose bookkeeping is skipped in this thread"""
+    if not hasattr(_state, 'deleting_users'):
+        _state.deleting_users = set()
+    return _state.deleting_users
+
+
+@contextmanager
+def bookkeeping_paused(user_id):
+    """Skip the handlers' bookkeeping for the user, done by the caller"""
+    users = _deleting_users()
+    paused = user_id not in users
+    users.add(user_id)
+    try:
+        yield
+    finally:
+        if paused:
+            users.discard(user_id)
+
+
+def names_namespace(kind, user_id):
+    """Return the cache namespace of the user's tag or ingredient names"""
+    return Namespace(f'names:{kind}:{user_id}')
+
+
+def shopping_list_namespace(user_id):
+    """Return the cache namespace of the user's shopping lists"""
+    return Namespace(f'shopping_list:{user_id}')
+
+
+def log_changes(user_id, kind, object_ids, deleted=False):
+    """
+    Record changed (or deleted) objects in the user's change log.
+
+    The user row is locked until the writing transaction commits, so
+    concurrent writers of a user's log take their entry IDs one after the
+    other, in commit order: a sync token never moves past an entry that
+    is committed later.
+    """
+    object_ids = list(object_ids)
+    if not object_ids or user_id in _deleting_users():
+        return
+    # After the commit: a read before it would cache the old rows under the
+    # new version
+    if kind != ChangeLog.RECIPE:
+        transaction.on_commit(names_namespace(kind, user_id).invalidate)
+    if kind != ChangeLog.TAG:
+        transaction.on_commit(shopping_list_namespace(user_id).invalidate)
+    with transaction.atomic():
+        list(
+            get_user_model().objects.select_for_update(no_key=True)
+            .filter(pk=user_id).values_list('pk', flat=True)
+        )
+        ChangeLog.objects.filter(
+            user_id=user_id, kind=kind, object_id__in=object_ids,
+        ).delete()
+        ChangeLog.objects.bulk_create(
+            ChangeLog(
+                user_id=user_id, kind=kind, object_id=object_id,
+                deleted=deleted,
+            )
+            for object_id in object_ids
+        )
+
+
+def recipes_changed(user_id, recipe_ids):
+    """Bump updated_at of the given recipes and log them as changed"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or user_id in _deleting_users():
+        return
+    Recipe.objects.filter(id__in=recipe_ids).update(updated_at=timezone.now())
+    log_changes(user_id, ChangeLog.RECIPE, recipe_ids)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def user_deleting(sender, instance, **kwargs):
+    """Skip bookkeeping for rows removed by a user's cascade delete"""
+    _deleting_users().add(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    """Resume bookkeeping once the user is deleted"""
+    _deleting_users().discard(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """Log a created or updated recipe"""
+    log_changes(instance.user_id, ChangeLog.RECIPE, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Log a tombstone for a deleted recipe"""
+    log_changes(
+        instance.user_id, ChangeLog.RECIPE, [instance.pk], deleted=True,
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_attrs_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump recipes whose tags or ingredients were added or removed"""
+    if not reverse:
+        if action in ('post_add', 'post_remove') and pk_set:
+            recipe_ids = [instance.pk]
+        elif action == 'post_clear':
+            recipe_ids = [instance.pk]
+        else:
+            return
+    elif action in ('post_add', 'post_remove'):
+        recipe_ids = list(pk_set or [])
+    elif action == 'pre_clear':
+        recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+    else:
+        return
+    recipes_changed(instance.user_id, recipe_ids)
+    signatures_changed(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """Log the item and bump recipes showing a renamed one"""
+    log_changes(instance.user_id, ATTR_KINDS[sender], [instance.pk])
+    if not created:
+        recipes_changed(
+            instance.user_id,
+            instance.recipe_set.values_list('id', flat=True),
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Bump recipes losing a deleted tag or ingredient"""
+    if instance.user_id in _deleting_users():
+        return
+    recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+    recipes_changed(instance.user_id, recipe_ids)
+    signatures_changed(recipe_ids)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Log a tombstone for a deleted tag or ingredient"""
+    log_changes(
+        instance.user_id, ATTR_KINDS[sender], [instance.pk], deleted=True,
+    )
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    """Drop the cached lookup of a changed or revoked token"""
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """Drop cached tokens holding an outdated copy of the user"""
+    if not created:
+        forget_tokens(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
@@ -0,0 +1,176 @@
+"""
+Similar recipes from MinHash signatures of their tags and ingredients
+
+A recipe's set of tags and ingredients is summarized by NUM_HASHES MinHash
+values; the share of positions where two signatures agree estimates the
+Jaccard similarity of the sets. Signatures are cut into BANDS bands whose
+hashes are stored as RecipeBand rows, so the candidates for a recipe are
+the recipes sharing a band bucket with it (locality sensitive hashing)
+and no query compares every pair of recipes. Candidates are then ranked
+by their exact Jaccard similarity.
+
+Signatures are recomputed after commit when a recipe's links change, see
+`signatures_changed`; `manage.py recompute_signatures` rebuilds them all.
+"""
+import hashlib
+import random
+
+from django.db import transaction
+from django.db.models import Q
+
+from core.models import Recipe, RecipeBand, RecipeSignature
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - exercised when numpy is missing
+    numpy = None
+
+
+NUM_HASHES = 64
+# 16 bands of 4 rows make recipes around 50% similar likely candidates
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+PRIME = 2 ** 31 - 1
+# Fixed seed: stored signatures must stay comparable across processes
+_random = random.Random(46)
+HASH_PARAMS = [
+    (_random.randrange(1, PRIME), _random.randrange(PRIME))
+    for _ in range(NUM_HASHES)
+]
+# Through model, its column, and the offset keeping tag and ingredient
+# features apart
+LINKS = (
+    (Recipe.tags.through, 'tag_id', 0),
+    (Recipe.ingredients.through, 'ingredient_id', 1),
+)
+MAX_CANDIDATES = 1000
+CHUNK_SIZE = 500
+
+
+def feature_sets(recipe_ids):
+    """Return {recipe_id: set of tag and ingredient features}"""
+    features = {pk: set() for pk in recipe_ids}
+    for through, column, offset in LINKS:
+        links = through.objects.filter(
+            recipe_id__in=features,
+        ).values_list('recipe_id', column)
+        for recipe_id, attr_id in links:
+            features[recipe_id].add((2 * attr_id + offset) % PRIME)
+    return features
+
+
+def minhash(features):
+    """Return the MinHash signature of a feature set, [] when empty"""
+    if not features:
+        return []
+    return [
+        min((a * x + b) % PRIME for x in features) for a, b in HASH_PARAMS
+    ]
+
+
+def minhash_many(features):
+    """Return {key: signature} for {key: feature set}, with numpy if any"""
+    if numpy is None:
+        return {key: minhash(f) for key, f in features.items()}
+
+    signatures = {key: [] for key, f in features.items() if not f}
+    keys = [key for key, f in features.items() if f]
+    if not keys:
+        return signatures
+    sizes = numpy.array([len(features[key]) for key in keys])
+    x = numpy.fromiter(
+        (x for key in keys for x in features[key]),
+        dtype=numpy.int64,
+        count=int(sizes.sum()),
+    )
+    a, b = (
+        numpy.array(column, dtype=numpy.int64)[:, None]
+        for column in zip(*HASH_PARAMS)
+    )
+    # One row per hash function, one column per feature; the minimum of
+    # each recipe's columns is its signature. Products stay below 2**62.
+    hashes = (a * x + b) % PRIME
+    starts = numpy.concatenate(([0], numpy.cumsum(sizes)[:-1]))
+    minimums = numpy.minimum.reduceat(hashes, starts, axis=1)
+    for column, key in enumerate(keys):
+        signatures[key] = minimums[:, column].tolist()
+    return signatures
+
+
+def band_buckets(signature):
+    """Return the bucket of every band of `signature`"""
+    if not signature:
+        return []
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(
+            b''.join(value.to_bytes(4, 'little') for value in rows),
+            digest_size=8,
+        ).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def save_signatures(signatures, users):
+    """Store {recipe_id: signature} of recipes owned by {recipe_id: user}"""
+    with transaction.atomic():
+        RecipeBand.objects.filter(recipe_id__in=signatures).delete()
+        RecipeSignature.objects.filter(recipe_id__in=signatures).delete()
+        RecipeSignature.objects.bulk_create(
+            RecipeSignature(recipe_id=pk, minhash=signature)
+            for pk, signature in signatures.items()
+        )
+        RecipeBand.objects.bulk_create(
+            RecipeBand(
+                user_id=users[pk], recipe_id=pk, band=band, bucket=bucket,
+            )
+            for pk, signature in signatures.items()
+            for band, bucket in enumerate(band_buckets(signature))
+        )
+
+
+def update_signatures(recipe_ids):
+    """Recompute the signatures of the given recipes that still exist"""
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), CHUNK_SIZE):
+        users = dict(Recipe.objects.filter(
+            id__in=recipe_ids[start:start + CHUNK_SIZE],
+        ).values_list('id', 'user_id'))
+        save_signatures(minhash_many(feature_sets(users)), users)
+
+
+def signatures_changed(recipe_ids):
+    """Recompute the recipes' signatures once the transaction commits"""
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: update_signatures(recipe_ids))
+
+
+def jaccard(a, b):
+    """Return the Jaccard similarity of two sets"""
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def similar_recipes(recipe, limit=10):
+    """Return [(recipe_id, similarity)] of the user's most similar recipes"""
+    buckets = Q()
+    for band, bucket in RecipeBand.objects.filter(
+        recipe_id=recipe.id,
+    ).values_list('band', 'bucket'):
+        buckets |= Q(band=band, bucket=bucket)
+    if not buckets:
+        return []
+    candidates = list(RecipeBand.objects.filter(
+        buckets, user_id=recipe.user_id,
+    ).exclude(recipe_id=recipe.id).values_list(
+        'recipe_id', flat=True,
+    ).distinct()[:MAX_CANDIDATES])
+
+    features = feature_sets([recipe.id, *candidates])
+    scores = [
+        (pk, jaccard(features[recipe.id], features[pk])) for pk in candidates
+    ]
+    scores.sort(key=lambda score: (-score[1], score[0]))
+    return scores[:limit]
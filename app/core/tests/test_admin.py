@@ -1,9 +1,18 @@
 """
 Test for the Django admin page modifications
 """
-from django.test import TestCase, Client
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from PIL import Image
+
+from core.admin import EstimatedCountPaginator
+from core.models import Ingredient, QueryFingerprint, Recipe, Tag
 
 
 class AdminSiteTests(TestCase):
@@ -43,3 +52,93 @@ class AdminSiteTests(TestCase):
         url = reverse('admin:core_user_add')  # /admin/core/user/add
         res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
+
+    def test_recipe_pages(self):
+        """Test recipe, tag and ingredient admin pages load and search"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Lentil soup', time_minutes=20,
+            price=Decimal('4.00'),
+        )
+        recipe.tags.add(tag)
+        Recipe.objects.create(
+            user=self.user, title='Steak', time_minutes=20,
+            price=Decimal('9.00'),
+        )
+
+        res = self.client.get(
+            reverse('admin:core_recipe_changelist'), {'q': 'lentil'},
+        )
+        change = self.client.get(
+            reverse('admin:core_recipe_change', args=[recipe.id]),
+        )
+        tags = self.client.get(reverse('admin:core_tag_changelist'))
+
+        self.assertContains(res, 'Lentil soup')
+        self.assertNotContains(res, 'Steak')
+        self.assertEqual(change.status_code, 200)
+        self.assertContains(tags, 'Vegan')
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=99)
+    def test_recipe_image_validated_on_upload(self):
+        """Test only newly uploaded recipe images are validated"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'), image='uploads/recipe/missing.jpg',
+        )
+        url = reverse('admin:core_recipe_change', args=[recipe.id])
+        data = {
+            'user': self.user.id, 'title': 'Lentil soup', 'description': '',
+            'time_minutes': 5, 'price': '1.00', 'link': '',
+            'tags': [Tag.objects.create(user=self.user, name='Vegan').id],
+            'ingredients': [
+                Ingredient.objects.create(user=self.user, name='Salt').id,
+            ],
+        }
+        buffer = BytesIO()
+        Image.new('1', (10, 10)).save(buffer, 'PNG')
+
+        res = self.client.post(url, data)
+        upload = self.client.post(url, {
+            **data, 'image': SimpleUploadedFile('a.png', buffer.getvalue()),
+        })
+
+        self.assertEqual(res.status_code, 302)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Lentil soup')
+        self.assertContains(upload, 'at most 99 pixels')
+
+    def test_query_fingerprint_pages(self):
+        """Test traced SQL is listed read-only"""
+        fingerprint = QueryFingerprint.objects.create(
+            fingerprint='a' * 32, view='recipe.views.RecipeViewSet.list',
+            statement='SELECT * FROM "core_recipe"', count=4, total_time=2,
+        )
+
+        res = self.client.get(
+            reverse('admin:core_queryfingerprint_changelist'),
+        )
+        change = self.client.get(reverse(
+            'admin:core_queryfingerprint_change', args=[fingerprint.id],
+        ))
+
+        self.assertContains(res, 'RecipeViewSet.list')
+        self.assertContains(res, '0.5')
+        self.assertNotContains(change, 'name="_save"')
+
+    def test_estimated_count_paginator(self):
+        """Test big unfiltered tables are counted from the estimate"""
+        queryset = Recipe.objects.all()
+        paginator = EstimatedCountPaginator(queryset, 100)
+
+        with patch.object(
+            EstimatedCountPaginator, 'estimated_count',
+            return_value=10_000_000,
+        ), self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 10_000_000)
+
+        small = EstimatedCountPaginator(queryset, 100)
+        with patch.object(
+            EstimatedCountPaginator, 'estimated_count', return_value=500,
+        ):
+            self.assertEqual(small.count, 0)
@@ -0,0 +1,129 @@
+"""
+Tests for the batch API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+BATCH_URL = reverse('core:batch')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class PublicBatchApiTests(TestCase):
+    """Test unauthenticated batch API access"""
+
+    def test_auth_required(self):
+        """Test auth is required for batches"""
+        res = APIClient().post(BATCH_URL, {'requests': [
+            {'method': 'GET', 'path': RECIPES_URL},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Test authenticated batch API access"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123', name='Test',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *requests):
+        return self.client.post(
+            BATCH_URL, {'requests': list(requests)}, format='json',
+        )
+
+    def test_load_screen(self):
+        """Test loading several endpoints in one batch"""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.batch(
+            {'method': 'GET', 'path': reverse('user:me')},
+            {'method': 'GET', 'path': RECIPES_URL},
+            {'method': 'GET', 'path': reverse('recipe:tag-list')},
+            {'method': 'GET', 'path': '/api/missing/'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        me, recipes, tags, missing = res.data['responses']
+        self.assertEqual(me['body']['email'], 'user@example.com')
+        self.assertEqual(recipes['body'][0]['title'], 'Soup')
+        self.assertEqual(tags['body'][0]['name'], 'Vegan')
+        self.assertIn('ETag', tags['headers'])
+        self.assertEqual(missing['status'], status.HTTP_404_NOT_FOUND)
+
+    def test_write_then_read(self):
+        """Test requests run in order with per item statuses"""
+        res = self.batch(
+            {'method': 'GET', 'path': RECIPES_URL},
+            {'method': 'POST', 'path': RECIPES_URL, 'body': {
+                'title': 'Soup', 'time_minutes': 5, 'price': '1.00',
+            }},
+            {'method': 'POST', 'path': RECIPES_URL, 'body': {}},
+            {'method': 'GET', 'path': RECIPES_URL},
+        )
+
+        before, created, invalid, after = res.data['responses']
+        self.assertEqual(before['body'], [])
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        self.assertEqual(invalid['status'], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(after['body'][0]['id'], created['body']['id'])
+
+    def test_identical_gets_run_once(self):
+        """Test repeated GETs share one response"""
+        one = self.batch({'method': 'GET', 'path': RECIPES_URL})
+        with self.assertNumQueries(1):
+            two = self.batch(
+                {'method': 'GET', 'path': RECIPES_URL},
+                {'method': 'GET', 'path': RECIPES_URL},
+            )
+
+        self.assertEqual(
+            two.data['responses'], one.data['responses'] * 2,
+        )
+
+    def test_sub_request_headers(self):
+        """Test per item headers reach the view"""
+        tags_url = reverse('recipe:tag-list')
+        etag = self.batch(
+            {'method': 'GET', 'path': tags_url},
+        ).data['responses'][0]['headers']['ETag']
+
+        res = self.batch({
+            'method': 'GET', 'path': tags_url,
+            'headers': {'If-None-Match': etag},
+        })
+
+        self.assertEqual(
+            res.data['responses'][0]['status'], status.HTTP_304_NOT_MODIFIED,
+        )
+
+    def test_nested_batch_rejected(self):
+        """Test a batch cannot contain a batch"""
+        res = self.batch({'method': 'POST', 'path': BATCH_URL, 'body': {}})
+
+        self.assertEqual(
+            res.data['responses'][0]['status'], status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_batch_size_limited(self):
+        """Test too many requests are rejected"""
+        with self.settings(BATCH_MAX_REQUESTS=2):
+            res = self.batch(*[{'method': 'GET', 'path': RECIPES_URL}] * 3)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,166 @@
+"""
+Tests for the cache backends and caching helpers
+"""
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.caching import Entry, Namespace, get_tiered_cache
+
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-shared',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-local',
+    },
+    'tiered': {
+        'BACKEND': 'core.caching.TieredCache',
+        'OPTIONS': {'L1': 'local', 'L2': 'default', 'L1_TIMEOUT': 60},
+    },
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TieredCacheTests(SimpleTestCase):
+    """Test the two level cache"""
+
+    def setUp(self):
+        self.cache = get_tiered_cache()
+        self.cache.clear()
+        self.l1, self.l2 = caches['local'], caches['default']
+
+    def test_read_through(self):
+        """Test L2 hits are kept in L1"""
+        self.l2.set('key', 'value')
+
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.l2.delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_writes_reach_both_levels(self):
+        """Test set and delete apply to L1 and L2"""
+        self.cache.set('key', 'value')
+
+        self.assertEqual(self.l1.get('key'), 'value')
+        self.assertEqual(self.l2.get('key'), 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_get_or_set_single_flight(self):
+        """Test concurrent misses compute the value once"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_tiered_cache().get_or_set('key', compute, 60)
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    @patch('core.caching.random.random', return_value=0.5)
+    def test_get_or_set_refreshes_early(self, patched_random):
+        """Test an entry close to expiring is recomputed before it does"""
+        self.cache.set('key', Entry('old', 10, time.time() + 1), 60)
+
+        value = self.cache.get_or_set('key', lambda: 'new', 60)
+
+        self.assertEqual(value, 'new')
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    @patch('core.caching.random.random', return_value=0.5)
+    def test_get_or_set_serves_stale_while_computing(self, patched_random):
+        """Test a reader serves the old value while another refreshes"""
+        self.cache.set('key', Entry('old', 10, time.time() + 1), 60)
+        self.l2.add('key:computing', 1)
+
+        value = self.cache.get_or_set('key', lambda: 'new', 60)
+
+        self.assertEqual(value, 'old')
+
+    @patch('core.caching.time.sleep')
+    def test_get_or_set_waits_for_other_process(self, patched_sleep):
+        """Test a cold miss waits for the process computing the value"""
+        self.l2.add('key:computing', 1)
+        patched_sleep.side_effect = lambda seconds: self.l2.set('key', 'v')
+
+        value = self.cache.get_or_set('key', lambda: 'mine', 60)
+
+        self.assertEqual(value, 'v')
+
+    def test_namespace_invalidate(self):
+        """Test invalidating a namespace moves its keys"""
+        recipes = Namespace('recipes:1')
+        key = recipes.key('list')
+        self.cache.set(key, 'value')
+
+        recipes.invalidate()
+
+        self.assertNotEqual(recipes.key('list'), key)
+        self.assertIsNone(self.cache.get(recipes.key('list')))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached"""
+
+    def setUp(self):
+        get_tiered_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('user:me')
+
+    def test_token_cached(self):
+        """Test the token is only looked up once"""
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):  # Only the job list itself
+            res = self.client.get(reverse('core:job-list'))
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_revoked_token_rejected(self):
+        """Test deleting a token stops it authenticating"""
+        self.client.get(self.url)
+        self.token.delete()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 401)
+
+    def test_inactive_user_rejected(self):
+        """Test deactivating a user stops their cached token"""
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 401)
@@ -3,31 +3,90 @@ Test custom Django management commands
 """
 from unittest.mock import patch
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from core.management.commands.import_profile import (
+    parse_importtime,
+    summarize_by_package,
+)
 
-@patch('core.management.commands.wait_for_db.Command.check')
+
+@patch('core.management.commands.wait_for_db.Command.probe_database')
 class CommandTests(SimpleTestCase):
     """Test commands"""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """Test waiting for db when db is available"""
-        patched_check.return_value = True
+        patched_probe.return_value = None
 
         call_command('wait_for_db')
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_probe.assert_called_once_with('default')
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+    def test_wait_for_db_delay(self, patched_sleep, patched_probe):
         """Test waiting for db when getting OperationalError"""
-        patched_check.side_effect = [Psycopg2Error] * 2 + \
-            [OperationalError] * 3 + [True]
+        patched_probe.side_effect = [Psycopg2Error] * 2 + \
+            [OperationalError] * 3 + [None]
 
         call_command('wait_for_db')
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        self.assertEqual(patched_probe.call_count, 6)
+        patched_probe.assert_called_with('default')
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_probe):
+        """Test delays grow exponentially up to the maximum"""
+        patched_probe.side_effect = [OperationalError] * 5 + [None]
+
+        call_command('wait_for_db', initial_delay=1, max_delay=4)
+
+        delays = [c.args[0] for c in patched_sleep.call_args_list]
+        for delay, base in zip(delays, [1, 2, 4, 4, 4]):
+            self.assertGreaterEqual(delay, base / 2)
+            self.assertLessEqual(delay, base)
+
+    def test_wait_for_db_timeout(self, patched_probe):
+        """Test giving up once the deadline has passed"""
+        patched_probe.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0)
+
+    def test_wait_for_db_named_databases(self, patched_probe):
+        """Test only the requested aliases are probed"""
+        call_command('wait_for_db', databases=['default'], caches=['default'])
+
+        patched_probe.assert_called_once_with('default')
+
+
+class ImportProfileTests(SimpleTestCase):
+    """Test summarizing -X importtime output"""
+
+    output = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       100 |        100 |     rest_framework.fields\n'
+        'import time:        50 |        150 |   rest_framework\n'
+        'import time:       300 |        300 | yaml\n'
+        'unrelated stderr line\n'
+    )
+
+    def test_parse_importtime(self):
+        """Test rows are parsed and the header skipped"""
+        rows = parse_importtime(self.output)
+
+        self.assertEqual(rows, [
+            ('rest_framework.fields', 100, 100),
+            ('rest_framework', 50, 150),
+            ('yaml', 300, 300),
+        ])
+
+    def test_summarize_by_package(self):
+        """Test self time is summed per top-level package"""
+        totals = summarize_by_package(parse_importtime(self.output))
+
+        self.assertEqual(totals, [('yaml', 300), ('rest_framework', 150)])
@@ -0,0 +1,122 @@
+"""
+Tests for the validation of uploaded images
+"""
+import struct
+import zlib
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image, JpegImagePlugin
+
+from core.images import validate_image
+
+
+def image_bytes(size=(80, 60), fmt='JPEG'):
+    """Return the bytes of a plain image"""
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def png_chunk(kind, data):
+    return (
+        struct.pack('>I', len(data)) + kind + data
+        + struct.pack('>I', zlib.crc32(kind + data))
+    )
+
+
+def png_bomb(width, height):
+    """Return a valid PNG of black pixels, a few kilobytes at any size"""
+    row = b'\0' * (1 + (width + 7) // 8)  # Filter byte, 1 bit per pixel
+    compressor = zlib.compressobj(9)
+    data = b''.join(compressor.compress(row) for _ in range(height))
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 0,
+                                         0, 0, 0))
+        + png_chunk(b'IDAT', data + compressor.flush())
+        + png_chunk(b'IEND', b'')
+    )
+
+
+def jpeg_claiming(width, height):
+    """Return a small JPEG whose header claims the given dimensions"""
+    data = bytearray(image_bytes())
+    # Start of frame: marker, length, precision, then height and width
+    sof = data.index(b'\xff\xc0')
+    data[sof + 5:sof + 9] = struct.pack('>HH', height, width)
+    return bytes(data)
+
+
+def upload(content, name='image.jpg'):
+    return SimpleUploadedFile(name, content)
+
+
+@override_settings(
+    IMAGE_UPLOAD_MAX_BYTES=100 * 1024, IMAGE_UPLOAD_MAX_PIXELS=10 ** 6,
+)
+class ValidateImageTests(SimpleTestCase):
+    """Test rejecting oversized and malformed images"""
+
+    def assertRejected(self, content, code, name='image.jpg'):
+        with self.assertRaises(ValidationError) as cm:
+            validate_image(upload(content, name))
+        self.assertEqual(cm.exception.code, code)
+
+    def test_valid_images(self):
+        """Test images within the limits are accepted"""
+        for fmt in ('JPEG', 'PNG', 'WEBP'):
+            file = upload(image_bytes((1000, 1000), fmt))
+
+            validate_image(file)
+
+            self.assertEqual(file.tell(), 0)
+
+    def test_png_bomb(self):
+        """Test a small PNG with too many pixels is rejected undecoded"""
+        content = png_bomb(20000, 20000)
+        self.assertLess(len(content), 100 * 1024)
+
+        with patch.object(Image.Image, 'load') as patched_load:
+            self.assertRejected(content, 'image_too_many_pixels', 'b.png')
+        patched_load.assert_not_called()
+
+    def test_jpeg_bomb(self):
+        """Test a JPEG header claiming a huge size is rejected"""
+        self.assertRejected(
+            jpeg_claiming(65000, 65000), 'image_too_many_pixels',
+        )
+
+    def test_jpeg_decoded_in_draft_mode(self):
+        """Test JPEGs are decoded at reduced size"""
+        sizes = []
+        load = JpegImagePlugin.JpegImageFile.load
+
+        def spy(image):
+            sizes.append(image.size)
+            return load(image)
+
+        with patch.object(JpegImagePlugin.JpegImageFile, 'load', spy):
+            validate_image(upload(image_bytes((800, 640))))
+
+        self.assertEqual(sizes, [(100, 80)])
+
+    def test_truncated(self):
+        """Test truncated images are rejected"""
+        content = image_bytes((800, 600))
+
+        self.assertRejected(content[:len(content) // 2], 'invalid_image')
+
+    def test_too_many_bytes(self):
+        """Test files over the byte limit are rejected before opening"""
+        with patch('core.images.Image.open') as patched_open:
+            self.assertRejected(b'\0' * (100 * 1024 + 1), 'image_too_large')
+        patched_open.assert_not_called()
+
+    def test_unsupported_format(self):
+        """Test formats other than JPEG, PNG and WebP are rejected"""
+        self.assertRejected(image_bytes(fmt='GIF'), 'image_format', 'a.gif')
+        self.assertRejected(b'not an image', 'invalid_image')
@@ -0,0 +1,205 @@
+"""
+Tests for background jobs
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.management.commands.run_worker import Command
+from core.models import Job
+
+
+JOBS_URL = reverse('core:job-list')
+
+calls = []
+
+
+@jobs.job('tests.add')
+def add(job, a, b):
+    calls.append((a, b))
+    jobs.set_progress(job, done=1, total=1)
+    return a + b
+
+
+@jobs.job('tests.fail', max_attempts=2)
+def fail(job):
+    raise RuntimeError('Boom')
+
+
+@jobs.job('tests.unserializable', max_attempts=1)
+def unserializable(job):
+    return object()
+
+
+def run_worker():
+    """Run queued jobs in the test's own connection and return output"""
+    out = StringIO()
+    call_command('run_worker', '--once', stdout=out)
+    return out.getvalue()
+
+
+# The worker must not close the connection holding the test transaction
+@patch('core.management.commands.run_worker.close_old_connections')
+@patch('core.management.commands.run_worker.connection')
+class JobTests(TestCase):
+    """Test queueing and running jobs"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_job(self, *mocks):
+        """Test a queued job runs once and stores its result"""
+        job = jobs.enqueue('tests.add', a=1, b=2)
+
+        run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, 3)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.progress, {'done': 1, 'total': 1})
+        self.assertEqual(calls, [(1, 2)])
+
+    def test_future_job_not_run(self, *mocks):
+        """Test a job is not run before its run_at"""
+        job = jobs.enqueue(
+            'tests.add', run_at=timezone.now() + timedelta(hours=1), a=1, b=2,
+        )
+
+        run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(calls, [])
+
+    def test_failed_job_retried_with_backoff(self, *mocks):
+        """Test a failing job is queued again later, then fails"""
+        job = jobs.enqueue('tests.fail')
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_delay_doubles(self, *mocks):
+        """Test the retry delay doubles up to the maximum"""
+        with self.settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=30):
+            self.assertEqual(jobs.retry_delay(1), timedelta(seconds=10))
+            self.assertEqual(jobs.retry_delay(2), timedelta(seconds=20))
+            self.assertEqual(jobs.retry_delay(5), timedelta(seconds=30))
+
+    def test_stale_job_requeued(self, *mocks):
+        """Test a job left running by a dead worker runs again"""
+        job = jobs.enqueue('tests.add', a=2, b=2)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+
+        run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+
+    def test_stale_jobs_requeued_while_running(self, *mocks):
+        """Test workers look for stale jobs periodically, not only once"""
+        jobs.enqueue('tests.add', a=1, b=2)
+        jobs.enqueue('tests.add', a=3, b=4)
+
+        with patch.object(Command, 'requeue_interval', 0), \
+                patch('core.jobs.requeue_stale', return_value=0) as requeue:
+            run_worker()
+
+        self.assertEqual(requeue.call_count, 3)
+
+    def test_requeued_job_outcome_dropped(self, *mocks):
+        """Test a worker does not overwrite a job claimed again since"""
+        job = jobs.enqueue('tests.add', a=1, b=2)
+        job = jobs.claim('worker-1')
+        Job.objects.filter(pk=job.pk).update(locked_by='worker-2')
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.locked_by, 'worker-2')
+        self.assertIsNone(job.result)
+
+    def test_unserializable_result_fails_job(self, *mocks):
+        """Test a result that cannot be stored fails the job"""
+        job = jobs.enqueue('tests.unserializable')
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('not JSON serializable', job.last_error)
+        self.assertIsNone(job.locked_at)
+
+    def test_enqueue_unknown_job(self, *mocks):
+        """Test queueing an unregistered job raises"""
+        with self.assertRaises(ValueError):
+            jobs.enqueue('tests.missing')
+
+
+class JobApiTests(TestCase):
+    """Test the job status API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test auth is required to view jobs"""
+        res = APIClient().get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_own_jobs(self):
+        """Test listing only the user's jobs"""
+        job = jobs.enqueue('tests.add', user=self.user, a=1, b=1)
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        jobs.enqueue('tests.add', user=other, a=1, b=1)
+
+        res = self.client.get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([j['id'] for j in res.data], [job.id])
+        self.assertEqual(res.data[0]['status'], Job.QUEUED)
+
+    def test_retrieve_job(self):
+        """Test retrieving a job's status"""
+        job = jobs.enqueue('tests.add', user=self.user, a=1, b=1)
+
+        res = self.client.get(reverse('core:job-detail', args=[job.id]))
+
+        self.assertEqual(res.data['name'], 'tests.add')
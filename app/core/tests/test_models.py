@@ -3,6 +3,7 @@ Test for models
 """
 from unittest.mock import patch
 from decimal import Decimal
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -88,4 +89,40 @@ class ModelTests(TestCase):
 
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
 
+    def test_recipe_updated_at_bumped_by_tags(self):
+        """Test adding or renaming a tag bumps the recipe updated_at"""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        tag = models.Tag.objects.create(user=user, name='Tag1')
+        created = recipe.updated_at
+
+        recipe.tags.add(tag)
+        recipe.refresh_from_db()
+        added = recipe.updated_at
+        tag.name = 'Tag2'
+        tag.save()
+        recipe.refresh_from_db()
+
+        self.assertGreater(added, created)
+        self.assertGreater(recipe.updated_at, added)
+        self.assertLessEqual(recipe.created_at, created)
+
+    def test_change_log_one_entry_per_object(self):
+        """Test an object keeps a single, latest change log entry"""
+        user = create_user()
+        tag = models.Tag.objects.create(user=user, name='Tag1')
+        first = models.ChangeLog.objects.get(object_id=tag.id)
+        tag.name = 'Tag2'
+        tag.save()
 
+        entry = models.ChangeLog.objects.get(object_id=tag.id)
+        self.assertGreater(entry.id, first.id)
+        with self.assertRaises(IntegrityError):
+            models.ChangeLog.objects.create(
+                user=user, kind=models.ChangeLog.TAG, object_id=tag.id,
+            )
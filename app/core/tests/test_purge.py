@@ -0,0 +1,160 @@
+"""
+Tests for deleting users and their data
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core import jobs
+from core.models import ChangeLog, Job, Recipe, Tag, Ingredient
+from core.purge import purge_user
+
+
+def create_user(email='user@example.com'):
+    """Create and return a user owning two tagged recipes"""
+    user = get_user_model().objects.create_user(email, 'testpass123')
+    tag = Tag.objects.create(user=user, name='Vegan')
+    ingredient = Ingredient.objects.create(user=user, name='Salt')
+    for title in ('Soup', 'Stew'):
+        recipe = Recipe.objects.create(
+            user=user, title=title, time_minutes=5, price=Decimal('1.00'),
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+    Token.objects.create(user=user)
+    return user
+
+
+class PurgeUserTests(TestCase):
+    """Test the user deletion pipeline"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = create_user()
+        self.other = create_user('other@example.com')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def assert_only_other_left(self):
+        """Assert only the other user's data is left"""
+        for model in (Recipe, Tag, Ingredient, ChangeLog, Token):
+            self.assertEqual(
+                set(model.objects.values_list('user_id', flat=True)),
+                {self.other.id},
+            )
+        self.assertEqual(
+            set(Recipe.tags.through.objects.values_list(
+                'recipe__user_id', flat=True,
+            )),
+            {self.other.id},
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+
+    def test_purge_user(self):
+        """Test the user and everything they own are deleted"""
+        recipe = Recipe.objects.filter(user=self.user).first()
+        recipe.image.save('soup.jpg', ContentFile(b'image'))
+        path = recipe.image.path
+        stages = []
+
+        deleted = purge_user(
+            self.user.pk, chunk_size=1,
+            progress=lambda stage, counts: stages.append(stage),
+        )
+
+        self.assert_only_other_left()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(deleted['recipes'], 2)
+        self.assertEqual(deleted['links'], 4)
+        self.assertEqual(deleted['images'], 1)
+        self.assertEqual(deleted['tokens'], 1)
+        self.assertEqual(
+            stages,
+            ['tokens', 'recipes', 'recipes', 'tags', 'ingredients']
+            + ['changes'] * 4 + ['user'],
+        )
+
+    def test_shared_image_kept(self):
+        """Test an image file still used by another recipe is kept"""
+        recipe = Recipe.objects.filter(user=self.user).first()
+        recipe.image.save('soup.jpg', ContentFile(b'image'))
+        Recipe.objects.filter(user=self.other).update(image=recipe.image.name)
+
+        deleted = purge_user(self.user.pk)
+
+        self.assertEqual(deleted['images'], 0)
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_queries_bounded_by_chunks(self):
+        """Test recipes are deleted with a few statements per chunk"""
+        for _ in range(20):
+            Recipe.objects.create(
+                user=self.user, title='More', time_minutes=5,
+                price=Decimal('1.00'),
+            )
+        ChangeLog.objects.filter(user=self.user).delete()
+
+        with self.assertNumQueries(38):
+            purge_user(self.user.pk, chunk_size=100)
+
+        self.assert_only_other_left()
+
+    def test_command(self):
+        """Test the command deletes the user found by email"""
+        out = StringIO()
+
+        call_command('purge_user', 'user@example.com', stdout=out)
+
+        self.assert_only_other_left()
+        self.assertIn('Deleted user@example.com', out.getvalue())
+
+    def test_command_unknown_user(self):
+        """Test the command rejects an unknown user"""
+        with self.assertRaises(CommandError):
+            call_command('purge_user', 'nobody@example.com')
+
+    @patch('core.management.commands.run_worker.close_old_connections')
+    @patch('core.management.commands.run_worker.connection')
+    def test_command_async(self, *mocks):
+        """Test the command queues a job that the worker runs"""
+        call_command(
+            'purge_user', str(self.user.pk), '--async', stdout=StringIO(),
+        )
+        job = Job.objects.get(name='user.purge')
+
+        call_command('run_worker', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['recipes'], 2)
+        self.assertEqual(job.progress['stage'], 'user')
+        self.assert_only_other_left()
+
+    def test_job_queued_for_the_user_survives(self):
+        """Test a purge job owned by the user is kept with its result"""
+        jobs.autodiscover()
+        job = jobs.enqueue('user.purge', user=self.user, user_id=self.user.pk)
+        job = jobs.claim('test')
+
+        jobs.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertIsNone(job.user)
+        self.assert_only_other_left()
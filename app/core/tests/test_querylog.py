@@ -0,0 +1,108 @@
+"""
+Tests for the slow query log and SQL traces
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import jobs, querylog
+from core.models import Job, QueryFingerprint
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+VIEW = 'recipe.views.RecipeViewSet'
+
+
+class NormalizeTests(SimpleTestCase):
+    """Test fingerprinting statements"""
+
+    def test_normalize(self):
+        """Test literals and parameter lists are collapsed"""
+        self.assertEqual(
+            querylog.normalize(
+                "SELECT *  FROM t\n WHERE a = 'x' AND b IN (%s, %s, %s) "
+                'LIMIT 21'
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (?) LIMIT ?',
+        )
+        self.assertEqual(
+            querylog.normalize('INSERT INTO t2 VALUES (%s, %s), (%s, %s)'),
+            querylog.normalize('INSERT INTO t2 VALUES (%s, %s)'),
+        )
+
+
+class QueryLogMiddlewareTests(TestCase):
+    """Test logging and tracing the SQL of requests"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def run_jobs(self):
+        job = jobs.claim('test')
+        while job is not None:
+            jobs.run(job)
+            self.assertEqual(job.status, Job.SUCCEEDED)
+            job = jobs.claim('test')
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged(self):
+        """Test slow statements are logged with the view, action and user"""
+        with self.assertLogs('core.sql', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertIn(
+            f'in {VIEW} action=list user={self.user.id}: SELECT',
+            logs.output[-1],
+        )
+
+    def test_trace_header_staff_only(self):
+        """Test only staff users can trace a request"""
+        res = self.client.get(RECIPES_URL, HTTP_X_SQL_TRACE='1')
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertFalse(QueryFingerprint.objects.exists())
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(RECIPES_URL, HTTP_X_SQL_TRACE='1')
+        self.client.get(RECIPES_URL, HTTP_X_SQL_TRACE='1')
+        self.run_jobs()
+
+        self.assertIn('1 queries', res['Server-Timing'])
+        fingerprint = QueryFingerprint.objects.get()
+        self.assertEqual(fingerprint.view, f'{VIEW}.list')
+        self.assertEqual(fingerprint.count, 2)
+        self.assertIn('FROM "core_recipe"', fingerprint.statement)
+        self.assertGreaterEqual(fingerprint.total_time, fingerprint.max_time)
+
+    @override_settings(SQL_TRACE_SAMPLE_RATE=1)
+    def test_sampled(self):
+        """Test sampled requests are recorded without a response header"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertFalse(QueryFingerprint.objects.exists())
+        self.run_jobs()
+        self.assertTrue(
+            QueryFingerprint.objects.filter(view=f'{VIEW}.list').exists(),
+        )
+
+    @override_settings(SLOW_QUERY_MS=0, SQL_TRACE_SAMPLE_RATE=1)
+    def test_streamed_response_traced(self):
+        """Test the queries of a streamed body are logged and traced"""
+        res = self.client.get(RECIPES_URL, {'stream': 1})
+
+        with self.assertLogs('core.sql', 'WARNING') as logs:
+            b''.join(res.streaming_content)
+
+        self.assertIn(f'in {VIEW} action=list', logs.output[0])
+        self.run_jobs()
+        self.assertTrue(
+            QueryFingerprint.objects.filter(view=f'{VIEW}.list').exists(),
+        )
@@ -0,0 +1,101 @@
+"""
+Tests for the JSON renderers and parsers
+"""
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the orjson backed renderer"""
+
+    def test_render_matches_json_renderer(self):
+        """Test output decodes to the same data as the stdlib renderer"""
+        data = [{'id': 1, 'title': 'Pie', 'tags': [{'id': 2, 'name': 'x'}]}]
+
+        res = ORJSONRenderer().render(data)
+
+        expected = json.loads(JSONRenderer().render(data))
+        self.assertEqual(json.loads(res), expected)
+
+    def test_render_decimal_as_string(self):
+        """Test decimals keep their precision"""
+        res = ORJSONRenderer().render({'price': Decimal('5.10')})
+
+        self.assertEqual(json.loads(res), {'price': '5.10'})
+
+    def test_render_escapes_line_separators(self):
+        """Test U+2028 and U+2029 are escaped like JSONRenderer does"""
+        res = ORJSONRenderer().render({'title': 'a\u2028b\u2029c'})
+
+        self.assertIn(b'\\u2028', res)
+        self.assertIn(b'\\u2029', res)
+
+    def test_render_none(self):
+        """Test rendering None returns an empty body"""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_render_indent_falls_back(self):
+        """Test indentation orjson can not produce uses the stdlib"""
+        res = ORJSONRenderer().render(
+            {'id': 1}, 'application/json; indent=4'
+        )
+
+        self.assertEqual(res, b'{\n    "id": 1\n}')
+
+    @patch('core.renderers.orjson', None)
+    def test_render_without_orjson(self):
+        """Test the renderer falls back when orjson is missing"""
+        res = ORJSONRenderer().render({'price': Decimal('5.10')})
+
+        self.assertEqual(json.loads(res), {'price': '5.10'})
+
+    def test_render_decimal_as_float(self):
+        """Test COERCE_DECIMAL_TO_STRING is honoured with or without orjson"""
+        data = {'price': Decimal('5.10')}
+        with self.settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'COERCE_DECIMAL_TO_STRING': False,
+        }):
+            res = ORJSONRenderer().render(data)
+            with patch('core.renderers.orjson', None):
+                fallback = ORJSONRenderer().render(data)
+
+        self.assertEqual(json.loads(res), {'price': 5.1})
+        self.assertEqual(json.loads(fallback), {'price': 5.1})
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test the orjson backed parser"""
+
+    def test_parse(self):
+        """Test parsing a JSON body"""
+        body = io.BytesIO(b'{"title": "Pie", "price": 5.5}')
+        res = ORJSONParser().parse(body)
+
+        self.assertEqual(res, {'title': 'Pie', 'price': 5.5})
+
+    def test_parse_error(self):
+        """Test invalid JSON raises a ParseError"""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_parse_rejects_nan(self):
+        """Test NaN is rejected as with STRICT_JSON"""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"price": NaN}'))
+
+    @patch('core.parsers.orjson', None)
+    def test_parse_without_orjson(self):
+        """Test the parser falls back when orjson is missing"""
+        res = ORJSONParser().parse(io.BytesIO(b'{"title": "Pie"}'))
+
+        self.assertEqual(res, {'title': 'Pie'})
@@ -0,0 +1,113 @@
+"""
+Tests for the read replica router and primary pinning
+"""
+import math
+import time
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import routers
+from core.middleware import PrimaryPinMiddleware
+from core.models import Recipe
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+@patch('core.routers.replica_lag')
+class RouterTests(SimpleTestCase):
+    """Test routing reads and writes"""
+
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        routers.pin_to_primary(False)
+
+    def tearDown(self):
+        routers.pin_to_primary(False)
+
+    def test_reads_go_to_replicas(self, patched_lag):
+        """Test reads are sent to a replica"""
+        patched_lag.return_value = 0
+
+        db = self.router.db_for_read(Recipe)
+
+        self.assertIn(db, ['replica_1', 'replica_2'])
+
+    def test_writes_go_to_primary(self, patched_lag):
+        """Test writes are sent to the primary"""
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_lagging_replica_skipped(self, patched_lag):
+        """Test replicas over the lag limit are not used"""
+        patched_lag.side_effect = lambda alias: {
+            'replica_1': 60, 'replica_2': 0,
+        }[alias]
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'replica_2')
+
+    def test_no_replica_available(self, patched_lag):
+        """Test reads fall back to the primary without healthy replicas"""
+        patched_lag.return_value = math.inf
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_pinned_reads_go_to_primary(self, patched_lag):
+        """Test a pinned thread reads from the primary"""
+        patched_lag.return_value = 0
+        routers.pin_to_primary()
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_replicas_not_migrated(self, patched_lag):
+        """Test migrations only run on the primary"""
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+class PrimaryPinMiddlewareTests(SimpleTestCase):
+    """Test pinning clients to the primary after writes"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(routers.is_pinned())
+            return HttpResponse()
+
+        self.middleware = PrimaryPinMiddleware(view)
+
+    def test_write_pins_request_and_client(self):
+        """Test a write runs on the primary and returns a pin"""
+        res = self.middleware(self.factory.post('/'))
+
+        self.assertEqual(self.seen, [True])
+        self.assertIn('db_pin', res.cookies)
+        self.assertEqual(res['X-DB-Pin'], res.cookies['db_pin'].value)
+
+    def test_read_without_pin(self):
+        """Test a plain read is not pinned"""
+        res = self.middleware(self.factory.get('/'))
+
+        self.assertEqual(self.seen, [False])
+        self.assertNotIn('db_pin', res.cookies)
+
+    def test_read_with_pin_cookie_or_header(self):
+        """Test reads carrying an unexpired pin use the primary"""
+        until = str(int(time.time()) + 5)
+        request = self.factory.get('/')
+        request.COOKIES['db_pin'] = until
+
+        self.middleware(request)
+        self.middleware(self.factory.get('/', HTTP_X_DB_PIN=until))
+
+        self.assertEqual(self.seen, [True, True])
+
+    def test_expired_or_far_pin_ignored(self):
+        """Test expired pins and pins beyond the allowed window are ignored"""
+        now = int(time.time())
+
+        self.middleware(self.factory.get('/', HTTP_X_DB_PIN=str(now - 1)))
+        self.middleware(self.factory.get('/', HTTP_X_DB_PIN=str(now + 3600)))
+
+        self.assertEqual(self.seen, [False, False])
@@ -0,0 +1,112 @@
+"""
+Tests for the cached OpenAPI schema
+"""
+import gzip
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import schema
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class AcceptsGzipTests(SimpleTestCase):
+    """Test parsing Accept-Encoding"""
+
+    def test_accepts_gzip(self):
+        """Test gzip is used unless its q-value is 0"""
+        for header, expected in (
+            ('gzip', True),
+            ('deflate, GZIP;q=0.5', True),
+            ('br, *', True),
+            ('', False),
+            ('gzip;q=0', False),
+            ('gzip; q=0.0, deflate', False),
+            ('*, gzip;q=0', False),
+            ('identity', False),
+        ):
+            with self.subTest(header=header):
+                self.assertIs(schema.accepts_gzip(header), expected)
+
+
+class CachedSchemaTests(TestCase):
+    """Test serving the pre-built schema"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        # enterContext needs Python 3.11
+        schema_root = self.settings(SCHEMA_ROOT=self.root.name)
+        schema_root.enable()
+        self.addCleanup(schema_root.disable)
+        schema._artifacts.clear()
+        self.addCleanup(schema._artifacts.clear)
+
+    def test_schema_generated_once(self):
+        """Test the schema is generated on the first request only"""
+        with patch(
+            'core.schema.generate_schema', wraps=schema.generate_schema,
+        ) as patched_generate:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn(b'openapi', first.content)
+        self.assertEqual(first.content, second.content)
+        patched_generate.assert_called_once()
+        self.assertTrue(any(Path(self.root.name).glob('schema-*.yaml')))
+
+    def test_schema_if_none_match(self):
+        """Test a matching ETag returns 304"""
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_schema_gzip(self):
+        """Test the schema is gzipped when the client accepts it"""
+        plain = self.client.get(SCHEMA_URL)
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertNotEqual(res['ETag'], plain['ETag'])
+
+    def test_schema_gzip_refused(self):
+        """Test gzip with a q-value of 0 is not used"""
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn(b'openapi', res.content)
+
+    def test_schema_json(self):
+        """Test JSON is served when requested"""
+        res = self.client.get(
+            SCHEMA_URL, HTTP_ACCEPT='application/vnd.oai.openapi+json',
+        )
+
+        self.assertEqual(res.json()['openapi'][:2], '3.')
+
+    def test_build_schema_command(self):
+        """Test the command writes artifacts the view then serves"""
+        stale = Path(self.root.name) / 'schema-old.yaml'
+        stale.write_bytes(b'old')
+
+        call_command('build_schema')
+        with patch('core.schema.generate_schema') as patched_generate:
+            res = self.client.get(SCHEMA_URL)
+
+        patched_generate.assert_not_called()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(stale.exists())
@@ -0,0 +1,120 @@
+"""
+Tests for recipe similarity signatures
+"""
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from core import similarity
+from core.models import Recipe, RecipeBand, RecipeSignature, Tag, Ingredient
+
+
+class MinHashTests(SimpleTestCase):
+    """Test computing signatures"""
+
+    def test_numpy_matches_python(self):
+        """Test the batch computation gives the pure Python signatures"""
+        features = {1: {3, 5, 8}, 2: set(), 3: {2 ** 31 - 2, 0}}
+
+        with patch('core.similarity.numpy', None):
+            expected = similarity.minhash_many(features)
+
+        self.assertEqual(similarity.minhash_many(features), expected)
+        self.assertEqual(expected[1], similarity.minhash({3, 5, 8}))
+        self.assertEqual(expected[2], [])
+
+    def test_estimates_jaccard(self):
+        """Test agreeing positions approximate the Jaccard similarity"""
+        a = set(range(0, 60))
+        b = set(range(20, 80))
+        sig_a, sig_b = similarity.minhash(a), similarity.minhash(b)
+
+        agree = sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+        self.assertAlmostEqual(agree, similarity.jaccard(a, b), delta=0.15)
+
+    def test_band_buckets(self):
+        """Test equal signatures share every bucket"""
+        signature = similarity.minhash({1, 2, 3})
+
+        buckets = similarity.band_buckets(signature)
+
+        self.assertEqual(len(buckets), similarity.BANDS)
+        self.assertEqual(buckets, similarity.band_buckets(list(signature)))
+        self.assertEqual(similarity.band_buckets([]), [])
+
+
+class SignatureTests(TestCase):
+    """Test storing and querying signatures"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(6)
+        ]
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def create_recipe(self, tags, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                user=user or self.user, title='Recipe', time_minutes=5,
+                price=Decimal('1.00'),
+            )
+            recipe.tags.add(*tags)
+            recipe.ingredients.add(self.salt)
+        return recipe
+
+    def test_signature_updated_on_links_change(self):
+        """Test adding and removing links recomputes the signature"""
+        recipe = self.create_recipe(self.tags[:2])
+        signature = RecipeSignature.objects.get(recipe=recipe).minhash
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.remove(self.tags[0])
+
+        self.assertNotEqual(
+            RecipeSignature.objects.get(recipe=recipe).minhash, signature,
+        )
+        self.assertEqual(
+            RecipeBand.objects.filter(recipe=recipe).count(),
+            similarity.BANDS,
+        )
+
+    def test_similar_recipes(self):
+        """Test recipes sharing links are ranked by Jaccard similarity"""
+        recipe = self.create_recipe(self.tags[:4])
+        same = self.create_recipe(self.tags[:4])
+        close = self.create_recipe(self.tags[:3])
+        self.create_recipe(self.tags[5:])
+        other_user = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        others = self.create_recipe(self.tags[:4], user=other_user)
+
+        scores = similarity.similar_recipes(recipe)
+
+        self.assertEqual(scores[:2], [(same.id, 1.0), (close.id, 0.8)])
+        self.assertNotIn(others.id, [pk for pk, _ in scores])
+
+    def test_recompute_command(self):
+        """Test the command rebuilds missing signatures"""
+        recipe = self.create_recipe(self.tags[:2])
+        expected = RecipeSignature.objects.get(recipe=recipe).minhash
+        RecipeSignature.objects.all().delete()
+        RecipeBand.objects.all().delete()
+        out = StringIO()
+
+        call_command('recompute_signatures', '--chunk-size', '1', stdout=out)
+
+        self.assertEqual(
+            RecipeSignature.objects.get(recipe=recipe).minhash, expected,
+        )
+        self.assertEqual(RecipeBand.objects.count(), similarity.BANDS)
+        self.assertIn('Recomputed 1 recipes', out.getvalue())
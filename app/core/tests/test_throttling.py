@@ -0,0 +1,155 @@
+"""
+Tests for the token bucket throttle
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.throttling import TokenBucketThrottle
+
+
+class ThrottledView:
+    """Stand-in view with a per action scope"""
+    action = 'create'
+    throttle_scopes = {'create': 'test'}
+
+
+class Throttle(TokenBucketThrottle):
+    THROTTLE_RATES = {'test': '3/min'}  # Refills one token every 20s
+
+    def __init__(self, now):
+        super().__init__()
+        self.now = now
+
+    def timer(self):
+        return self.now
+
+
+def make_request():
+    return Request(APIRequestFactory().post('/'))
+
+
+class TokenBucketThrottleTests(TestCase):
+    """Test the token bucket algorithm"""
+
+    def setUp(self):
+        cache.clear()
+        Throttle._local_buckets.clear()
+        self.request = make_request()
+        self.view = ThrottledView()
+
+    def allowed(self, now):
+        """Return whether a request at `now` is allowed and its throttle"""
+        throttle = Throttle(now)
+        return throttle.allow_request(self.request, self.view), throttle
+
+    def test_burst_then_reject(self):
+        """Test a full bucket allows its capacity, then rejects"""
+        results = [self.allowed(1000)[0] for _ in range(4)]
+
+        self.assertEqual(results, [True, True, True, False])
+
+    def test_retry_after(self):
+        """Test a rejected request says when the next token arrives"""
+        for _ in range(3):
+            self.allowed(1000)
+
+        allowed, throttle = self.allowed(1005)
+
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 15)
+
+    def test_refill(self):
+        """Test tokens are refilled at the configured rate"""
+        for _ in range(3):
+            self.allowed(1000)
+
+        self.assertTrue(self.allowed(1020)[0])
+        self.assertFalse(self.allowed(1020)[0])
+
+    def test_idle_time_does_not_exceed_burst(self):
+        """Test a long idle bucket still only allows its capacity"""
+        self.allowed(1000)
+
+        results = [self.allowed(1500)[0] for _ in range(4)]
+
+        self.assertEqual(results, [True, True, True, False])
+
+    def test_rejections_do_not_use_tokens(self):
+        """Test hammering a full bucket does not delay the refill"""
+        for _ in range(10):
+            self.allowed(1000)
+
+        self.assertTrue(self.allowed(1020)[0])
+
+    def test_unscoped_action_allowed(self):
+        """Test actions without a scope are not throttled"""
+        self.view.action = 'list'
+
+        results = [self.allowed(1000)[0] for _ in range(10)]
+
+        self.assertTrue(all(results))
+
+    @patch.object(Throttle, 'take_shared', side_effect=ConnectionError)
+    def test_local_fallback(self, patched_take):
+        """Test buckets are kept in process when the cache fails"""
+        with self.assertLogs('core.throttling', 'ERROR') as logs:
+            results = [self.allowed(1000)[0] for _ in range(4)]
+            self.assertTrue(self.allowed(1020)[0])
+
+        self.assertEqual(results, [True, True, True, False])
+        self.assertIn('Throttle cache unavailable', logs.output[0])
+
+
+@patch.dict(
+    TokenBucketThrottle.THROTTLE_RATES,
+    {'recipe_write': '2/min', 'user_create': '1/hour'},
+)
+class ThrottleApiTests(TestCase):
+    """Test throttled write endpoints"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recipe_create_throttled(self):
+        """Test creating recipes too fast returns 429 with Retry-After"""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        ))
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'}
+        url = reverse('recipe:recipe-list')
+
+        codes = [client.post(url, payload).status_code for _ in range(3)]
+        res = client.post(url, payload)
+
+        self.assertEqual(codes[:2], [status.HTTP_201_CREATED] * 2)
+        self.assertEqual(codes[2], status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_user_create_throttled_per_ip(self):
+        """Test sign ups are throttled by client IP"""
+        url = reverse('user:create')
+        client = APIClient()
+
+        first = client.post(url, {
+            'email': 'one@example.com', 'password': 'testpass123',
+            'name': 'One',
+        })
+        second = client.post(url, {
+            'email': 'two@example.com', 'password': 'testpass123',
+            'name': 'Two',
+        })
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            second.status_code, status.HTTP_429_TOO_MANY_REQUESTS,
+        )
@@ -0,0 +1,106 @@
+"""
+Tests for the thumbnail disk cache
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from core import thumbnails
+from core.thumbnails import ThumbnailCache
+
+
+def image_file(size=(800, 600), fmt='JPEG'):
+    """Return the bytes of a plain image"""
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class ThumbnailCacheTests(SimpleTestCase):
+    """Test rendering and evicting variants"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = FileSystemStorage(os.path.join(self.root, 'media'))
+        self.cache = ThumbnailCache(os.path.join(self.root, 'thumbs'), 10 ** 6)
+
+    def stored(self, name='photo.jpg', **kwargs):
+        name = self.storage.save(name, ContentFile(image_file(**kwargs)))
+        return self.storage.open(name)
+
+    def test_render_variant(self):
+        """Test a variant is rendered once at the requested width"""
+        source = self.stored()
+
+        path = self.cache.get(source, 320)
+
+        self.assertEqual(self.cache.content_type(path), 'image/jpeg')
+        with Image.open(os.path.join(self.cache.root, path)) as image:
+            self.assertEqual(image.size, (320, 240))
+        with patch('core.thumbnails.render') as patched_render:
+            self.assertEqual(self.cache.get(source, 320), path)
+        patched_render.assert_not_called()
+
+    def test_no_upscaling(self):
+        """Test images narrower than the width keep their size"""
+        path = self.cache.get(
+            self.stored('icon.png', size=(100, 50), fmt='PNG'), 320,
+        )
+
+        self.assertEqual(self.cache.content_type(path), 'image/png')
+        with Image.open(os.path.join(self.cache.root, path)) as image:
+            self.assertEqual(image.size, (100, 50))
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=800 * 600 - 1)
+    def test_too_many_pixels(self):
+        """Test images over the upload pixel limit are not decoded"""
+        with self.assertRaises(OSError):
+            self.cache.get(self.stored(), 320)
+
+    def test_concurrent_requests_render_once(self):
+        """Test concurrent misses for a variant render it once"""
+        source_name = self.stored().name
+        calls = []
+        render = thumbnails.render
+
+        def slow_render(*args):
+            calls.append(1)
+            time.sleep(0.05)
+            render(*args)
+
+        with patch('core.thumbnails.render', slow_render):
+            threads = [
+                threading.Thread(target=self.cache.get, args=(
+                    self.storage.open(source_name), 160,
+                ))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_evict_least_recently_used(self):
+        """Test the oldest variants are removed above the size limit"""
+        paths = [self.cache.get(self.stored(), width) for width in (64, 160)]
+        full_paths = [os.path.join(self.cache.root, p) for p in paths]
+        os.utime(full_paths[0], (time.time() - 60, time.time() - 60))
+        # Over the limit with both, under its 90% low mark with one
+        self.cache.max_size = int(os.path.getsize(full_paths[1]) / 0.9) + 1
+
+        self.cache.evict(force=True)
+
+        self.assertFalse(os.path.exists(full_paths[0]))
+        self.assertTrue(os.path.exists(full_paths[1]))
@@ -0,0 +1,117 @@
+"""
+Token bucket throttling shared by every worker through the cache
+"""
+import logging
+import math
+import threading
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Limit requests per user, or per IP for anonymous clients.
+
+    The view picks a scope per action with `throttle_scopes`, or one scope
+    for every request with `throttle_scope`; rates come from
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], e.g. '60/min' allows bursts
+    of 60 requests refilled at one per second. Actions without a scope are
+    not throttled.
+
+    A bucket is two cache keys: the time it was last full and the number
+    of tokens taken since, incremented atomically. When the cache is down
+    each process falls back to its own buckets.
+    """
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+    refill_periods_ttl = 10  # Bucket keys outlive a full refill this often
+
+    local_max_buckets = 10000
+    _local_buckets = {}  # key -> (level, updated_at) when the cache fails
+    _local_lock = threading.Lock()
+
+    def __init__(self):
+        # The rate depends on the view, so it is only read in allow_request
+        self.retry_after = None
+
+    def get_scope(self, view):
+        """Return the throttle scope for the view's current action"""
+        scopes = getattr(view, 'throttle_scopes', None)
+        if scopes is not None:
+            return scopes.get(getattr(view, 'action', None))
+        return getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(view)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.capacity, duration = self.parse_rate(self.rate)
+        self.refill_rate = self.capacity / duration  # Tokens per second
+        self.ttl = int(duration * self.refill_periods_ttl)
+
+        key = self.get_cache_key(request, view)
+        now = self.timer()
+        try:
+            level = self.take_shared(key, now)
+        except Exception:
+            logger.exception('Throttle cache unavailable')
+            level = self.take_local(key, now)
+
+        if level <= self.capacity:
+            return True
+        self.retry_after = (level - self.capacity) / self.refill_rate
+        return False
+
+    def take_shared(self, key, now):
+        """Take a token from the bucket in the cache, return the level"""
+        start_key, count_key = f'{key}:start', f'{key}:count'
+        start = self.cache.get(start_key)
+        if start is None:
+            self.cache.add(start_key, now, self.ttl)
+            self.cache.add(count_key, 0, self.ttl)
+            start = self.cache.get(start_key, now)
+        try:
+            taken = self.cache.incr(count_key)
+        except ValueError:  # Evicted since the bucket was started
+            start, taken = now, 1
+        level = taken - (now - start) * self.refill_rate
+        rejected = level > self.capacity
+
+        if level <= 1 or now - start > self.ttl / 2:
+            # The bucket was full, or its keys are about to expire: count
+            # from now so idle time does not add up to more than a burst.
+            # Racing requests may each reset it, which errs on allowing.
+            self.cache.set_many({
+                start_key: now,
+                count_key: math.ceil(max(level - rejected, 1)),
+            }, self.ttl)
+        elif rejected:
+            # Rejected requests do not use up tokens
+            self.cache.decr(count_key)
+        return level
+
+    def take_local(self, key, now):
+        """Take a token from this process's bucket, return the level"""
+        with self._local_lock:
+            if len(self._local_buckets) >= self.local_max_buckets:
+                self._local_buckets.clear()
+            level, updated_at = self._local_buckets.get(key, (0, now))
+            level = max(level - (now - updated_at) * self.refill_rate, 0)
+            level += 1
+            self._local_buckets[key] = (
+                level if level <= self.capacity else level - 1, now,
+            )
+        return level
+
+    def wait(self):
+        return self.retry_after
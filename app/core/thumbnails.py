@@ -0,0 +1,171 @@
+"""
+Resized image variants kept in a size-bounded disk cache
+
+Variants are rendered with Pillow on first request and stored under
+THUMBNAIL_ROOT as `<aa>/<image name>-<width>.<ext>`. A served variant has
+its modification time bumped (at most once per TOUCH_INTERVAL), so
+evicting the oldest files first keeps the most recently used ones (LRU).
+Once a variant has been written, eviction walks the cache (at most once
+per EVICT_INTERVAL seconds per process) and removes files until the
+cache is below 90% of THUMBNAIL_CACHE_MAX_SIZE.
+
+Concurrent requests for the same variant are coalesced with a lock file,
+so other processes on the host wait for the first one to render it
+rather than rendering it again.
+"""
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+# Variant extension -> (Pillow format, content type)
+FORMATS = {
+    'jpg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+}
+LOCK_STRIPES = 256  # Lock files shared by all variants, never deleted
+TOUCH_INTERVAL = 3600  # Seconds between bumps of a served variant
+EVICT_INTERVAL = 60
+
+_evict_lock = threading.Lock()
+_last_evict = 0
+
+
+def render(source, width, path, fmt):
+    """Write `source` resized to at most `width` pixels wide to `path`"""
+    with Image.open(source) as image:
+        # Images stored before uploads were validated, see core.images
+        if image.width * image.height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            raise OSError(f'Image of {image.width}x{image.height} pixels')
+        # Let the JPEG decoder skip detail the thumbnail will not show
+        image.draft(image.mode, (width, width))
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image.thumbnail((width, image.height), Image.LANCZOS)
+        if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(path, fmt, quality=85)
+
+
+class ThumbnailCache:
+    """Resized variants of stored images, cached under `root`"""
+
+    def __init__(self, root=None, max_size=None):
+        self.root = str(root or settings.THUMBNAIL_ROOT)
+        self.max_size = max_size or settings.THUMBNAIL_CACHE_MAX_SIZE
+
+    def relative_path(self, name, width):
+        """Return the variant's path relative to the cache root"""
+        stem, ext = os.path.splitext(os.path.basename(name))
+        ext = ext.lower().lstrip('.')
+        ext = 'jpg' if ext == 'jpeg' else ext
+        if ext not in FORMATS:
+            ext = 'png'
+        digest = hashlib.md5(name.encode()).hexdigest()
+        return os.path.join(digest[:2], f'{stem}-{width}.{ext}')
+
+    def content_type(self, relative_path):
+        return FORMATS[relative_path.rsplit('.', 1)[1]][1]
+
+    @contextmanager
+    def _lock(self, relative_path):
+        """Hold the lock of a variant, shared across processes"""
+        stripe = int(hashlib.md5(relative_path.encode()).hexdigest(), 16)
+        lock_dir = os.path.join(self.root, '.locks')
+        os.makedirs(lock_dir, exist_ok=True)
+        path = os.path.join(lock_dir, f'{stripe % LOCK_STRIPES}.lock')
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, field_file, width):
+        """Return the relative path of the variant, rendering it if needed"""
+        relative_path = self.relative_path(field_file.name, width)
+        path = os.path.join(self.root, relative_path)
+        if not self._touch(path):
+            with self._lock(relative_path):
+                if not os.path.exists(path):
+                    fmt = FORMATS[relative_path.rsplit('.', 1)[1]][0]
+                    self._render(field_file, width, path, fmt)
+            self.evict()
+        return relative_path
+
+    def delete(self, name):
+        """Remove every variant of the stored image `name`"""
+        for width in settings.THUMBNAIL_WIDTHS:
+            try:
+                os.unlink(
+                    os.path.join(self.root, self.relative_path(name, width)),
+                )
+            except FileNotFoundError:
+                pass
+
+    def _touch(self, path):
+        """Mark the variant as used, False when it does not exist"""
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        if time.time() - mtime > TOUCH_INTERVAL:
+            os.utime(path)
+        return True
+
+    def _render(self, field_file, width, path, fmt):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Render next to the target and rename, so that readers never
+        # see a partly written file.
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix='.tmp',
+        )
+        try:
+            with os.fdopen(fd, 'wb') as tmp, field_file.open('rb') as source:
+                render(source, width, tmp, fmt)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def evict(self, force=False):
+        """Remove the least recently used variants above the size limit"""
+        global _last_evict
+        with _evict_lock:
+            if not force and time.monotonic() - _last_evict < EVICT_INTERVAL:
+                return
+            _last_evict = time.monotonic()
+
+        files = []
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d != '.locks']
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_size:
+            return
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_size * 0.9:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
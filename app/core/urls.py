@@ -0,0 +1,19 @@
+"""
+URLs for core app
+"""
+from django.urls import path, include
+
+from rest_framework.routers import DefaultRouter
+
+from core import views
+
+
+router = DefaultRouter()
+router.register('jobs', views.JobViewSet)
+
+app_name = 'core'
+
+urlpatterns = [
+    path('batch/', views.BatchView.as_view(), name='batch'),
+    path('', include(router.urls)),
+]
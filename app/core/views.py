@@ -1,11 +1,148 @@
 """
 Core views
 """
+import io
+import json
+import logging
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema
+from rest_framework import viewsets
 from rest_framework.decorators import api_view
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.models import Job
+from core.serializers import (
+    BatchResponseSerializer,
+    BatchSerializer,
+    JobSerializer,
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 @api_view(["GET"])
 def health_check(request):
     """Health check endpoint"""
     return Response({"status": True})
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """View status of the authenticated user's background jobs"""
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        """Retrieve jobs for authenticated user"""
+        queryset = self.queryset.filter(user=self.request.user)
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset.order_by('-id')
+
+
+class BatchView(APIView):
+    """
+    Run several API requests in one round trip.
+
+    Each request is dispatched to its view in turn with the batch's
+    authenticated user, and answered with its own status, headers and
+    body. Identical GETs are only run once unless a write comes between
+    them. Requests run independently: a failing one does not undo others.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    forwarded_headers = ('ETag', 'Last-Modified', 'Location', 'Retry-After')
+
+    def sub_request(self, request, item):
+        """Return a Django request for `item` in the batch's context"""
+        path, _, query = item['path'].partition('?')
+        body = b''
+        if 'body' in item:
+            body = json.dumps(item['body'], cls=JSONEncoder).encode()
+        environ = {
+            key: value for key, value in request.META.items()
+            # Conditional and idempotency headers belong to the batch
+            if not key.startswith(('HTTP_IF_', 'HTTP_IDEMPOTENCY_'))
+        }
+        environ.update({
+            'REQUEST_METHOD': item['method'],
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.input': io.BytesIO(body),
+        })
+        for header, value in item.get('headers', {}).items():
+            environ['HTTP_' + header.upper().replace('-', '_')] = value
+        sub_request = WSGIRequest(environ)
+        # Reuse the batch's authentication instead of repeating it
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+        return sub_request
+
+    def run(self, request, item):
+        """Dispatch one request of the batch and return its result"""
+        try:
+            match = resolve(item['path'].partition('?')[0])
+        except Resolver404:
+            return {'status': 404, 'headers': {}, 'body': {
+                'detail': 'Not found.',
+            }}
+        if getattr(match.func, 'view_class', None) is type(self):
+            return {'status': 400, 'headers': {}, 'body': {
+                'detail': 'Batches cannot be nested.',
+            }}
+
+        try:
+            response = match.func(
+                self.sub_request(request, item), *match.args, **match.kwargs
+            )
+        except Exception:
+            logger.exception('Batch request %s %s failed', item['method'],
+                             item['path'])
+            return {'status': 500, 'headers': {}, 'body': {
+                'detail': 'Server error.',
+            }}
+        body = getattr(response, 'data', None)
+        if body is None and response.get('Content-Type', '').startswith(
+            'application/json'
+        ) and not response.streaming and response.content:
+            body = json.loads(response.content)
+        return {
+            'status': response.status_code,
+            'headers': {
+                header: response[header]
+                for header in self.forwarded_headers
+                if response.has_header(header)
+            },
+            'body': body,
+        }
+
+    @extend_schema(request=BatchSerializer, responses=BatchResponseSerializer)
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        responses = []
+        gets = {}  # (path, headers) -> result of GETs since the last write
+        for item in serializer.validated_data['requests']:
+            if item['method'] != 'GET':
+                gets.clear()
+                responses.append(self.run(request, item))
+                continue
+            headers = tuple(sorted(item.get('headers', {}).items()))
+            key = (item['path'], headers)
+            if key not in gets:
+                gets[key] = self.run(request, item)
+            responses.append(gets[key])
+        return Response({'responses': responses})
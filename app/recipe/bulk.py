@@ -0,0 +1,164 @@
+"""
+Set-based bulk changes and copies of recipes, tags and ingredients
+
+Deletes and updates run in chunks of IDs, each in its own transaction.
+The per-object change log and recipe timestamp handlers of core.signals
+are paused meanwhile; these helpers call the same hooks once per chunk.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import (
+    ChangeLog,
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from core.purge import delete_unused_images
+from core.signals import (
+    ATTR_KINDS,
+    bookkeeping_paused,
+    log_changes,
+    recipes_changed,
+)
+from core.similarity import signatures_changed
+
+
+# Model -> (through model, its column pointing at the model)
+ATTR_THROUGH = {
+    Tag: (Recipe.tags.through, 'tag_id'),
+    Ingredient: (Recipe.ingredients.through, 'ingredient_id'),
+}
+
+
+def chunked(ids):
+    """Yield lists of at most BULK_CHUNK_SIZE IDs"""
+    ids = list(ids)
+    size = settings.BULK_CHUNK_SIZE
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def owned_ids(model, user, ids):
+    """Return the subset of `ids` that belong to `user`, in order"""
+    owned = set()
+    for chunk in chunked(ids):
+        owned.update(model.objects.filter(
+            user=user, id__in=chunk,
+        ).values_list('id', flat=True))
+    return [pk for pk in dict.fromkeys(ids) if pk in owned]
+
+
+def delete_recipes(user, ids):
+    """Delete the user's recipes in `ids`, return the IDs deleted"""
+    deleted = []
+    for chunk in chunked(ids):
+        with transaction.atomic():
+            rows = list(Recipe.objects.filter(
+                user=user, id__in=chunk,
+            ).values_list('id', 'image'))
+            if not rows:
+                continue
+            chunk = [pk for pk, _ in rows]
+            with bookkeeping_paused(user.id):
+                Recipe.objects.filter(id__in=chunk).delete()
+            log_changes(user.id, ChangeLog.RECIPE, chunk, deleted=True)
+        delete_unused_images(image for _, image in rows)
+        deleted += chunk
+    return deleted
+
+
+def delete_attrs(model, user, ids):
+    """Delete the user's tags or ingredients in `ids`, return the IDs"""
+    through, column = ATTR_THROUGH[model]
+    deleted = []
+    for chunk in chunked(ids):
+        with transaction.atomic():
+            chunk = list(model.objects.filter(
+                user=user, id__in=chunk,
+            ).values_list('id', flat=True))
+            if not chunk:
+                continue
+            recipe_ids = list(through.objects.filter(
+                **{f'{column}__in': chunk},
+            ).values_list('recipe_id', flat=True).distinct())
+            recipes_changed(user.id, recipe_ids)
+            signatures_changed(recipe_ids)
+            with bookkeeping_paused(user.id):
+                model.objects.filter(id__in=chunk).delete()
+            log_changes(user.id, ATTR_KINDS[model], chunk, deleted=True)
+        deleted += chunk
+    return deleted
+
+
+def update_objects(model, user, items, fields):
+    """
+    Apply validated `items` ({'id': ..., field: value}) owned by `user`.
+
+    Objects are written with bulk_update, one statement per chunk, and
+    their updated_at is bumped. Returns the IDs updated.
+    """
+    by_id = {item['id']: item for item in items}
+    updated = []
+    for chunk in chunked(owned_ids(model, user, by_id)):
+        now = timezone.now()
+        objs = []
+        for pk in chunk:
+            obj = model(id=pk, user=user, updated_at=now)
+            for field in fields:
+                setattr(obj, field, by_id[pk][field])
+            objs.append(obj)
+        with transaction.atomic():
+            model.objects.bulk_update(objs, [*fields, 'updated_at'])
+            if model is Recipe:
+                log_changes(user.id, ChangeLog.RECIPE, chunk)
+            else:
+                log_changes(user.id, ATTR_KINDS[model], chunk)
+                through, column = ATTR_THROUGH[model]
+                recipes_changed(user.id, through.objects.filter(
+                    **{f'{column}__in': chunk},
+                ).values_list('recipe_id', flat=True).distinct())
+        updated += chunk
+    return updated
+
+
+def clone_recipe(recipe, copies=1):
+    """
+    Copy `recipe` with its tags and ingredients `copies` times.
+
+    Runs the same few statements whatever the number of copies or links.
+    The copies share the original's image file rather than copying it.
+    Returns the IDs of the copies.
+    """
+    fields = [
+        field.attname for field in Recipe._meta.concrete_fields
+        if not field.primary_key
+    ]
+    links = {
+        through: list(through.objects.filter(
+            recipe_id=recipe.id,
+        ).values_list(column, flat=True))
+        for through, column in ATTR_THROUGH.values()
+    }
+    clones = [
+        Recipe(**{field: getattr(recipe, field) for field in fields})
+        for _ in range(copies)
+    ]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(clones)  # INSERT ... RETURNING id
+            ids = [clone.id for clone in clones]
+            log_changes(recipe.user_id, ChangeLog.RECIPE, ids)
+        else:
+            for clone in clones:
+                clone.save(force_insert=True)  # Logged by core.signals
+            ids = [clone.id for clone in clones]
+        for through, column in ATTR_THROUGH.values():
+            through.objects.bulk_create(
+                through(recipe_id=pk, **{column: attr_id})
+                for pk in ids
+                for attr_id in links[through]
+            )
+        signatures_changed(ids)
+    return ids
@@ -1,8 +1,10 @@
 """
 Serializers for recipe APIs
 """
+from django.conf import settings
 from rest_framework import serializers
 
+from core.images import validate_image
 from core.models import Recipe, Tag, Ingredient
 
 
@@ -35,25 +37,31 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
+    # Each add() bumps the recipe and recomputes its signature (see
+    # core.signals), so the items are linked with one call per relation.
     def _get_or_create_tags(self, tags, recipe):
         """Get or create tags"""
         auth_user = self.context['request'].user
+        tag_objs = []
         for tag in tags:
             tag_obj, created = Tag.objects.get_or_create(
                 user=auth_user,
                 **tag,
             )
-            recipe.tags.add(tag_obj)
+            tag_objs.append(tag_obj)
+        recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Get or create ingredients"""
         auth_user = self.context['request'].user
+        ingredient_objs = []
         for ingredient in ingredients:
             ingredient_obj, created = Ingredient.objects.get_or_create(
                 user=auth_user,
                 **ingredient,
             )
-            recipe.ingredients.add(ingredient_obj)
+            ingredient_objs.append(ingredient_obj)
+        recipe.ingredients.add(*ingredient_objs)
 
     def create(self, validated_data):
         """Create a recipe"""
@@ -90,6 +98,21 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ('description', 'image',)
 
 
+class SimilarRecipeSerializer(RecipeSerializer):
+    """Serializer for a recipe ranked by similarity to another"""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('similarity',)
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    """Serializer for an ingredient with the number of recipes using it"""
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.CharField(source='ingredient__name')
+    count = serializers.IntegerField()
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
 
@@ -97,4 +120,37 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'image')
         read_only_fields = ('id',)
-        extra_kwargs = {'image': {'required': True}}
+        # Only new uploads are validated, see core.images
+        extra_kwargs = {
+            'image': {'required': True, 'validators': [validate_image]},
+        }
+
+
+class RecipeCloneSerializer(serializers.Serializer):
+    """Serializer for the number of copies of a recipe to make"""
+    copies = serializers.IntegerField(
+        min_value=1, max_value=settings.RECIPE_CLONE_MAX, default=1,
+    )
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    """Serializer for IDs to delete in bulk"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.BULK_MAX_IDS,
+    )
+
+
+class BulkUpdateSerializer(serializers.Serializer):
+    """Serializer for objects to update in bulk, each with its ID"""
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=settings.BULK_MAX_IDS,
+    )
+
+
+class BulkResultSerializer(serializers.Serializer):
+    """Serializer for the IDs changed by a bulk action"""
+    ids = serializers.ListField(child=serializers.IntegerField())
@@ -0,0 +1,222 @@
+"""
+Tests for the bulk delete and update actions
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, ChangeLog
+from core.thumbnails import ThumbnailCache
+
+
+RECIPE_BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
+RECIPE_BULK_UPDATE_URL = reverse('recipe:recipe-bulk-update')
+TAG_BULK_DELETE_URL = reverse('recipe:tag-bulk-delete')
+TAG_BULK_UPDATE_URL = reverse('recipe:tag-bulk-update')
+INGREDIENT_BULK_DELETE_URL = reverse('recipe:ingredient-bulk-delete')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a test user"""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicBulkApiTests(TestCase):
+    """Test unauthenticated bulk API access"""
+
+    def test_auth_required(self):
+        """Test auth is required for bulk actions"""
+        res = APIClient().post(RECIPE_BULK_DELETE_URL, {'ids': [1]})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@patch('recipe.bulk.settings.BULK_CHUNK_SIZE', 2)
+class PrivateBulkApiTests(TestCase):
+    """Test authenticated bulk API access"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting recipes and their links by ID"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+        kept = create_recipe(user=self.user)
+        other = create_recipe(user=create_user(email='other@example.com'))
+        ids = [r.id for r in recipes]
+
+        res = self.client.post(
+            RECIPE_BULK_DELETE_URL, {'ids': ids + [other.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['ids'], ids)
+        self.assertEqual(
+            list(Recipe.objects.filter(user=self.user)), [kept],
+        )
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.assertEqual(
+            ChangeLog.objects.filter(
+                kind=ChangeLog.RECIPE, deleted=True,
+            ).count(),
+            3,
+        )
+
+    def test_bulk_delete_runs_set_based_sql(self):
+        """Test each chunk of IDs costs the same few statements"""
+        ids = [create_recipe(user=self.user).id for _ in range(4)]
+
+        # Per chunk: savepoint, select, the delete collector's select and
+        # 5 deletes, then the change log's savepoint, user lock, delete,
+        # insert and release, release; the chunk size is patched to 2.
+        with self.assertNumQueries(28):
+            self.client.post(
+                RECIPE_BULK_DELETE_URL, {'ids': ids}, format='json',
+            )
+
+    def test_bulk_delete_removes_images(self):
+        """Test unshared images and their thumbnails are removed"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(root, 'media'),
+            THUMBNAIL_ROOT=os.path.join(root, 'thumbnails'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        buffer = BytesIO()
+        Image.new('RGB', (100, 100)).save(buffer, 'JPEG')
+        recipe, shared, copy = (create_recipe(user=self.user) for _ in 'abc')
+        recipe.image.save('soup.jpg', ContentFile(buffer.getvalue()))
+        shared.image.save('stew.jpg', ContentFile(buffer.getvalue()))
+        Recipe.objects.filter(id=copy.id).update(image=shared.image.name)
+        thumbnail = os.path.join(
+            root, 'thumbnails', ThumbnailCache().get(recipe.image, 64),
+        )
+
+        self.client.post(
+            RECIPE_BULK_DELETE_URL, {'ids': [recipe.id, shared.id]},
+            format='json',
+        )
+
+        self.assertFalse(os.path.exists(recipe.image.path))
+        self.assertFalse(os.path.exists(thumbnail))
+        self.assertTrue(os.path.exists(shared.image.path))
+
+    def test_bulk_delete_tags_bumps_recipes(self):
+        """Test deleting tags updates the recipes that showed them"""
+        tags = [Tag.objects.create(user=self.user, name=n) for n in 'abc']
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tags[0])
+        updated_at = Recipe.objects.get(id=recipe.id).updated_at
+
+        res = self.client.post(
+            TAG_BULK_DELETE_URL, {'ids': [t.id for t in tags]},
+            format='json',
+        )
+
+        self.assertEqual(len(res.data['ids']), 3)
+        self.assertFalse(Tag.objects.exists())
+        self.assertEqual(recipe.tags.count(), 0)
+        self.assertGreater(
+            Recipe.objects.get(id=recipe.id).updated_at, updated_at,
+        )
+
+    def test_bulk_delete_ingredients(self):
+        """Test deleting ingredients by ID"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(
+            INGREDIENT_BULK_DELETE_URL, {'ids': [ingredient.id]},
+            format='json',
+        )
+
+        self.assertEqual(res.data['ids'], [ingredient.id])
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test updating fields of several recipes"""
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        other = create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.post(RECIPE_BULK_UPDATE_URL, {'items': [
+            {'id': recipes[0].id, 'title': 'Soup', 'price': '1.50'},
+            {'id': recipes[1].id, 'title': 'Stew', 'price': '2.50'},
+            {'id': recipes[2].id, 'time_minutes': 5},
+            {'id': other.id, 'title': 'Stolen'},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(res.data['ids']), sorted(r.id for r in recipes),
+        )
+        for recipe in recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(recipes[0].title, 'Soup')
+        self.assertEqual(recipes[1].price, Decimal('2.50'))
+        self.assertEqual(recipes[2].time_minutes, 5)
+        self.assertEqual(recipes[2].title, 'Sample recipe')
+        other.refresh_from_db()
+        self.assertEqual(other.title, 'Sample recipe')
+
+    def test_bulk_update_validates_items(self):
+        """Test invalid items reject the whole update"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.post(RECIPE_BULK_UPDATE_URL, {'items': [
+            {'id': recipe.id, 'title': 'Soup'},
+            {'id': recipe.id, 'time_minutes': 'soon'},
+            {'id': recipe.id, 'user': 1},
+            {'id': True, 'title': 'Stew'},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data['items']), {1, 2, 3})
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe')
+
+    def test_bulk_update_tags(self):
+        """Test renaming tags bumps their recipes"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        updated_at = Recipe.objects.get(id=recipe.id).updated_at
+
+        self.client.post(TAG_BULK_UPDATE_URL, {'items': [
+            {'id': tag.id, 'name': 'Vegetarian'},
+        ]}, format='json')
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegetarian')
+        self.assertGreater(
+            Recipe.objects.get(id=recipe.id).updated_at, updated_at,
+        )
@@ -9,6 +9,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.caching import get_tiered_cache
 from core.models import Ingredient, Recipe
 
 from recipe.serializers import IngredientSerializer
@@ -138,4 +139,30 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data), 1)
+
+
+class AutocompleteIngredientsApiTests(TestCase):
+    """Test listing ingredients by name prefix"""
+
+    def setUp(self):
+        get_tiered_cache().clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_prefix(self):
+        """Test ingredients starting with the prefix are listed"""
+        for name in ('Salt', 'salmon', 'Pepper'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {'prefix': 'sal'})
+
+        self.assertEqual(
+            [item['name'] for item in res.data], ['salmon', 'Salt'],
+        )
+        ingredient = Ingredient.objects.get(name='Salt')
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.delete()
+        res = self.client.get(INGREDIENTS_URL, {'prefix': 'sal'})
+        self.assertEqual([item['name'] for item in res.data], ['salmon'])
@@ -2,12 +2,19 @@
 Test for recipe API
 """
 from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+import json
 import tempfile
 import os
 
 from PIL import Image
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -18,6 +25,7 @@ from core.models import (
     Recipe,
     Tag,
     Ingredient,
+    ChangeLog,
 )
 
 from recipe.serializers import (
@@ -33,10 +41,27 @@ def detail_url(recipe_id):
     """Return recipe detail URL"""
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
+
 def image_upload_url(recipe_id):
     """Return URL for recipe image upload"""
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
+
+def similar_url(recipe_id):
+    """Return URL for recipes similar to a recipe"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def thumbnail_url(recipe_id):
+    """Return URL for a resized recipe image"""
+    return reverse('recipe:recipe-image', args=[recipe_id])
+
+
+def clone_url(recipe_id):
+    """Return URL for cloning a recipe"""
+    return reverse('recipe:recipe-clone', args=[recipe_id])
+
+
 def create_recipe(user, **params):
     """Helper function to create recipe"""
     defaults = {
@@ -49,6 +74,7 @@ def create_recipe(user, **params):
     defaults.update(params)
     return Recipe.objects.create(user=user, **defaults)
 
+
 def create_user(**params):
     """Helper function to create sample user"""
     return get_user_model().objects.create_user(**params)
@@ -222,6 +248,22 @@ class PrivateRecipeApiTests(TestCase):
             exists = recipe.tags.filter(name=tag['name'], user=self.user).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_links_once_per_relation(self):
+        """Test tags and ingredients are linked with one add() each"""
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 10,
+            'price': Decimal('2.50'),
+            'tags': [{'name': 'Vegan'}, {'name': 'Quick'}, {'name': 'Hot'}],
+            'ingredients': [{'name': 'Leek'}, {'name': 'Salt'}],
+        }
+
+        with patch('core.similarity.update_signatures') as patched_update, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(patched_update.call_count, 2)
+
     def test_create_recipe_with_existing_tags(self):
         """Test creating a recipe with existing tags"""
         tag1 = Tag.objects.create(user=self.user, name='Dessert')
@@ -406,6 +448,123 @@ class PrivateRecipeApiTests(TestCase):
         self.assertNotIn(serializer3.data, res.data)
 
 
+class ConditionalRecipeApiTests(TestCase):
+    """Test conditional GET on the recipe detail"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_detail_returns_validators(self):
+        """Test the detail response carries ETag and Last-Modified"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+    def test_if_none_match_returns_304(self):
+        """Test a matching ETag short-circuits with one query"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag,
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_returns_304(self):
+        """Test an up to date If-Modified-Since returns 304"""
+        last_modified = self.client.get(
+            detail_url(self.recipe.id)
+        )['Last-Modified']
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tag_change_invalidates_etag(self):
+        """Test adding a tag changes the recipe ETag"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_other_user_recipe_not_found(self):
+        """Test validators are not computed for other users' recipes"""
+        recipe = create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StreamingRecipeApiTests(TestCase):
+    """Test streaming the recipe list as NDJSON"""
+
+    def setUp(self):
+        """Setup"""
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _stream(self, res):
+        """Return the decoded NDJSON rows of a streamed response"""
+        body = b''.join(res.streaming_content)
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_stream_query_param(self):
+        """Test ?stream=1 returns every recipe as one JSON line"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        create_recipe(user=self.user)
+        create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.get(RECIPES_URL, {'stream': 1})
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            self._stream(res),
+            json.loads(json.dumps(serializer.data)),
+        )
+
+    def test_stream_accept_header(self):
+        """Test Accept: application/x-ndjson streams the list"""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/x-ndjson')
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(len(self._stream(res)), 1)
+
+    @patch('recipe.views.RecipeViewSet.stream_chunk_size', 2)
+    def test_stream_chunks_keep_order_and_filters(self):
+        """Test rows spanning several chunks keep order and filters"""
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        for recipe in recipes[:3]:
+            recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, {'stream': 1, 'tags': tag.id})
+
+        ids = [row['id'] for row in self._stream(res)]
+        self.assertEqual(ids, [r.id for r in reversed(recipes[:3])])
+
+
 class ImageUploadTests(TestCase):
     """Test image upload"""
 
@@ -447,3 +606,390 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=99)
+    def test_upload_image_too_many_pixels(self):
+        """Test images over the pixel limit are rejected"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('1', (10, 10)).save(image_file, format='PNG')
+            image_file.seek(0)
+            res = self.client.post(
+                url, {'image': image_file}, format='multipart',
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(self.recipe.image)
+
+
+class IdempotentRecipeApiTests(TestCase):
+    """Test retrying writes with an Idempotency-Key"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            'title': 'Soup',
+            'time_minutes': 10,
+            'price': Decimal('2.50'),
+            'tags': [{'name': 'Vegan'}],
+        }
+
+    def create(self, key, payload=None):
+        return self.client.post(
+            RECIPES_URL, payload or self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_returns_first_response(self):
+        """Test a retried create returns the stored recipe"""
+        first = self.create('abc')
+        with self.assertNumQueries(0):
+            retry = self.create('abc')
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_new_key_creates_again(self):
+        """Test a different key is a new request"""
+        self.create('abc')
+        self.create('def')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_keys_are_per_user(self):
+        """Test another user's key does not replay"""
+        self.create('abc')
+        self.client.force_authenticate(
+            create_user(email='other@example.com', password='test123'),
+        )
+
+        res = self.create('abc')
+
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_key_reused_for_other_payload(self):
+        """Test reusing a key with a different body is rejected"""
+        self.create('abc')
+
+        res = self.create('abc', dict(self.payload, title='Stew'))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    @patch('core.idempotency.time.sleep')
+    def test_duplicate_waits_for_first(self, patched_sleep):
+        """Test a duplicate arriving mid request waits on the first"""
+        real_add = cache.add
+        adds = []
+        first = []
+
+        def add(key, *args, **kwargs):
+            if key.startswith('idempotency:'):
+                adds.append(key)
+                if len(adds) == 1:
+                    return False  # The lock is held by the first request
+            return real_add(key, *args, **kwargs)
+        # The first request completes while the duplicate waits
+        patched_sleep.side_effect = lambda seconds: first.append(
+            self.create('abc')
+        )
+        with patch('core.idempotency.cache.add', side_effect=add):
+            res = self.create('abc')
+
+        self.assertEqual(res['Idempotent-Replayed'], 'true')
+        self.assertEqual(res.data, first[0].data)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    @patch('core.idempotency.time.sleep')
+    def test_duplicate_times_out(self, patched_sleep):
+        """Test a duplicate gives up with 409 if the first never ends"""
+        with self.settings(IDEMPOTENCY_WAIT=0), \
+                patch('core.idempotency.cache.add', return_value=False):
+            res = self.create('abc')
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_expired_lock_of_other_request_kept(self):
+        """Test a request does not release a lock taken after it expired"""
+        real_add = cache.add
+        locks = []
+
+        def add(key, *args, **kwargs):
+            added = real_add(key, *args, **kwargs)
+            if added and key.endswith(':lock'):
+                # The lock expires mid request and a retry takes it
+                locks.append(key)
+                cache.set(key, 'retry')
+            return added
+        with patch('core.idempotency.cache.add', side_effect=add):
+            self.create('abc')
+
+        self.assertEqual(cache.get(locks[0]), 'retry')
+
+    def test_upload_image_retry(self):
+        """Test a retried image upload returns the stored response"""
+        recipe = create_recipe(user=self.user)
+        url = image_upload_url(recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            responses = []
+            for _ in range(2):
+                image_file.seek(0)
+                responses.append(self.client.post(
+                    url, {'image': image_file}, format='multipart',
+                    HTTP_IDEMPOTENCY_KEY='img',
+                ))
+
+        recipe.refresh_from_db()
+        self.assertEqual(responses[1].data, responses[0].data)
+        self.assertEqual(responses[1]['Idempotent-Replayed'], 'true')
+        recipe.image.delete()
+
+
+class CloneRecipeApiTests(TestCase):
+    """Test copying recipes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Vegan'),
+            Tag.objects.create(user=self.user, name='Dinner'),
+        )
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt'),
+        )
+
+    def test_clone_recipe(self):
+        """Test a copy has the recipe's fields, tags and ingredients"""
+        self.recipe.image.save('soup.jpg', ContentFile(b'image'))
+        self.addCleanup(self.recipe.image.delete)
+
+        res = self.client.post(clone_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 1)
+        clone = Recipe.objects.get(id=res.data[0]['id'])
+        self.assertNotEqual(clone.id, self.recipe.id)
+        for field in ('title', 'time_minutes', 'price', 'description',
+                      'link', 'user'):
+            self.assertEqual(
+                getattr(clone, field), getattr(self.recipe, field),
+            )
+        self.assertEqual(clone.image.name, self.recipe.image.name)
+        self.assertEqual(
+            set(clone.tags.all()), set(self.recipe.tags.all()),
+        )
+        self.assertEqual(
+            set(clone.ingredients.all()), set(self.recipe.ingredients.all()),
+        )
+        self.assertEqual(
+            res.data[0], RecipeDetailSerializer(
+                clone, context={'request': res.wsgi_request},
+            ).data,
+        )
+        self.assertTrue(ChangeLog.objects.filter(
+            kind=ChangeLog.RECIPE, object_id=clone.id,
+        ).exists())
+
+    def test_clone_many(self):
+        """Test several copies are made at once"""
+        res = self.client.post(
+            clone_url(self.recipe.id), {'copies': 3}, format='json',
+        )
+
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(Recipe.objects.count(), 4)
+        self.assertEqual(Recipe.tags.through.objects.count(), 8)
+        self.assertEqual(self.recipe.tags.count(), 2)
+
+    @skipUnlessDBFeature('can_return_rows_from_bulk_insert')
+    def test_clone_queries_constant(self):
+        """Test the queries do not grow with the number of copies"""
+        counts = []
+        for copies in (1, 10):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(
+                    clone_url(self.recipe.id), {'copies': copies},
+                    format='json',
+                )
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_clone_too_many(self):
+        """Test the number of copies is limited"""
+        res = self.client.post(
+            clone_url(self.recipe.id), {'copies': 1000}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_clone_other_users_recipe(self):
+        """Test copying another user's recipe is not found"""
+        other = create_user(email='other@example.com', password='test123')
+        recipe = create_recipe(user=other)
+
+        res = self.client.post(clone_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+
+class SimilarRecipeApiTests(TestCase):
+    """Test listing similar recipes"""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dinner', 'Quick', 'Soup')
+        ]
+
+    def create_recipe(self, tags, **params):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(user=self.user, **params)
+            recipe.tags.add(*tags)
+        return recipe
+
+    def test_similar_recipes(self):
+        """Test recipes are listed by similarity, best first"""
+        recipe = self.create_recipe(self.tags)
+        close = self.create_recipe(self.tags[:3], title='Close')
+        same = self.create_recipe(self.tags, title='Same')
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['id'], r['similarity']) for r in res.data],
+            [(same.id, 1.0), (close.id, 0.75)],
+        )
+        self.assertEqual(res.data[0]['title'], 'Same')
+        self.assertEqual(len(res.data[0]['tags']), 4)
+
+        res = self.client.get(similar_url(recipe.id), {'limit': 1})
+        self.assertEqual(len(res.data), 1)
+
+    def test_similar_without_links(self):
+        """Test a recipe without tags or ingredients has no similar ones"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.data, [])
+
+    def test_similar_other_users_recipe(self):
+        """Test another user's recipe is not found"""
+        other = create_user(email='other@example.com', password='test123')
+
+        res = self.client.get(similar_url(create_recipe(user=other).id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ThumbnailApiTests(TestCase):
+    """Test resized recipe images"""
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(self.root.name, 'media'),
+            THUMBNAIL_ROOT=os.path.join(self.root.name, 'thumbnails'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        image = Image.new('RGB', (1000, 500))
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            image.save(image_file, format='JPEG')
+            image_file.seek(0)
+            self.recipe.image.save('photo.jpg', image_file)
+        self.version = os.path.splitext(
+            os.path.basename(self.recipe.image.name)
+        )[0]
+
+    def test_resized_image(self):
+        """Test the image is returned at the requested width"""
+        res = self.client.get(
+            thumbnail_url(self.recipe.id), {'w': 320},
+            HTTP_ACCEPT='image/webp,image/*',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Cache-Control'], 'private, no-cache')
+        with Image.open(BytesIO(b''.join(res.streaming_content))) as image:
+            self.assertEqual(image.size, (320, 160))
+
+    def test_immutable_with_version(self):
+        """Test a URL naming the current image may be cached forever"""
+        res = self.client.get(
+            thumbnail_url(self.recipe.id), {'w': 320, 'v': self.version},
+        )
+
+        self.assertIn('immutable', res['Cache-Control'])
+        etag = res['ETag']
+        res = self.client.get(
+            thumbnail_url(self.recipe.id), {'w': 320, 'v': self.version},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(THUMBNAIL_ACCEL_PREFIX='/protected/thumbnails/')
+    def test_accel_redirect(self):
+        """Test nginx is told to send the cached file"""
+        res = self.client.get(thumbnail_url(self.recipe.id), {'w': 64})
+
+        self.assertTrue(res['X-Accel-Redirect'].startswith(
+            '/protected/thumbnails/'
+        ))
+        self.assertTrue(res['X-Accel-Redirect'].endswith(
+            f'{self.version}-64.jpg'
+        ))
+        self.assertEqual(res.content, b'')
+        # nginx passes this ETag on, so revalidations reach the app
+        res = self.client.get(
+            thumbnail_url(self.recipe.id), {'w': 64},
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotIn('X-Accel-Redirect', res)
+
+    def test_invalid_width(self):
+        """Test only the configured widths are rendered"""
+        for width in ('', 'big', '321'):
+            res = self.client.get(thumbnail_url(self.recipe.id), {'w': width})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_image(self):
+        """Test recipes without an image and other users' are not found"""
+        other = create_user(email='other@example.com', password='test123')
+        for recipe in (create_recipe(user=self.user),
+                       create_recipe(user=other, image=self.recipe.image)):
+            res = self.client.get(thumbnail_url(recipe.id), {'w': 64})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,139 @@
+"""
+Tests for the shopping list API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.caching import get_tiered_cache
+from core.models import Recipe, Ingredient
+
+
+SHOPPING_LIST_URL = reverse('recipe:shopping-list')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a test user"""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, ingredients):
+    """Create and return a recipe using the given ingredients"""
+    recipe = Recipe.objects.create(
+        user=user, title='Sample recipe', time_minutes=22,
+        price=Decimal('5.25'),
+    )
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class PublicShoppingListApiTests(TestCase):
+    """Test unauthenticated shopping list API access"""
+
+    def test_auth_required(self):
+        """Test auth is required for shopping lists"""
+        res = APIClient().get(SHOPPING_LIST_URL, {'recipes': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateShoppingListApiTests(TestCase):
+    """Test authenticated shopping list API access"""
+
+    def setUp(self):
+        get_tiered_cache().clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.salt, self.rice, self.leek = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Rice', 'Leek')
+        )
+        self.recipes = [
+            create_recipe(self.user, [self.salt, self.rice]),
+            create_recipe(self.user, [self.salt, self.leek]),
+            create_recipe(self.user, [self.leek]),
+        ]
+
+    def get(self, recipes, **headers):
+        return self.client.get(
+            SHOPPING_LIST_URL,
+            {'recipes': ','.join(str(r.id) for r in recipes)},
+            **headers,
+        )
+
+    def test_shopping_list(self):
+        """Test ingredients are counted across the selected recipes"""
+        res = self.get(self.recipes[:2])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': self.leek.id, 'name': 'Leek', 'count': 1},
+            {'id': self.rice.id, 'name': 'Rice', 'count': 1},
+            {'id': self.salt.id, 'name': 'Salt', 'count': 2},
+        ])
+
+    def test_unknown_recipes_rejected(self):
+        """Test unknown recipes and those of other users answer 404"""
+        other = create_user(email='other@example.com')
+        recipe = create_recipe(other, [])
+        self.get(self.recipes)
+
+        for recipes in ([self.recipes[2], recipe], self.recipes + [recipe]):
+            res = self.client.get(SHOPPING_LIST_URL, {
+                'recipes': ','.join(str(r.id) for r in recipes),
+            })
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertIn(str(recipe.id), res.data['recipes'])
+
+        # The list cached above is not served once a recipe is deleted
+        ids = ','.join(str(r.id) for r in self.recipes)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[2].delete()
+        res = self.client.get(SHOPPING_LIST_URL, {'recipes': ids})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached_until_write(self):
+        """Test a selection is served from the cache until recipes change"""
+        first = self.get(self.recipes)
+
+        with self.assertNumQueries(0):
+            again = self.get(list(reversed(self.recipes)))
+        self.assertEqual(again.data, first.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[2].ingredients.remove(self.leek)
+            # Not invalidated before the write commits
+            self.assertEqual(self.get(self.recipes).data, first.data)
+        res = self.get(self.recipes)
+        self.assertEqual(
+            [(item['name'], item['count']) for item in res.data],
+            [('Leek', 1), ('Rice', 1), ('Salt', 2)],
+        )
+
+        self.salt.name = 'Sea salt'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.save()
+        res = self.get(self.recipes)
+        self.assertEqual(res.data[-1]['name'], 'Sea salt')
+
+    def test_not_modified(self):
+        """Test an unchanged shopping list answers 304"""
+        etag = self.get(self.recipes)['ETag']
+
+        res = self.get(self.recipes, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalid_recipes(self):
+        """Test missing or malformed recipe IDs are rejected"""
+        for value in ('', 'a,b', ','.join(str(i) for i in range(1, 102))):
+            res = self.client.get(SHOPPING_LIST_URL, {'recipes': value})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
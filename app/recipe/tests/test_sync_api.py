@@ -0,0 +1,152 @@
+"""
+Tests for the delta sync API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, ChangeLog
+
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a test user"""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicSyncApiTests(TestCase):
+    """Test unauthenticated sync API access"""
+
+    def test_auth_required(self):
+        """Test auth is required for syncing"""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTests(TestCase):
+    """Test authenticated sync API access"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_full_sync(self):
+        """Test syncing from token 0 returns every object"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.tags.add(tag)
+        create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['recipes']['upserted']], [recipe.id],
+        )
+        self.assertEqual(
+            res.data['recipes']['upserted'][0]['tags'],
+            [{'id': tag.id, 'name': 'Vegan'}],
+        )
+        self.assertEqual(res.data['tags']['upserted'][0]['id'], tag.id)
+        self.assertEqual(
+            res.data['ingredients']['upserted'][0]['id'], ingredient.id,
+        )
+        self.assertFalse(res.data['has_more'])
+
+    def test_sync_since_token(self):
+        """Test only changes after the token are returned"""
+        old = create_recipe(user=self.user, title='Old')
+        token = self.client.get(SYNC_URL).data['token']
+        new = create_recipe(user=self.user, title='New')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tag_id = tag.id
+        tag.delete()
+
+        res = self.client.get(SYNC_URL, {'since': token})
+
+        ids = [r['id'] for r in res.data['recipes']['upserted']]
+        self.assertEqual(ids, [new.id])
+        self.assertNotIn(old.id, ids)
+        self.assertEqual(res.data['tags']['upserted'], [])
+        self.assertEqual(res.data['tags']['deleted'], [tag_id])
+        self.assertGreater(res.data['token'], token)
+
+    def test_sync_tombstones_replace_upserts(self):
+        """Test a deleted recipe is reported once as a tombstone"""
+        recipe = create_recipe(user=self.user)
+        recipe_id = recipe.id
+        recipe.delete()
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.data['recipes']['upserted'], [])
+        self.assertEqual(res.data['recipes']['deleted'], [recipe_id])
+        self.assertEqual(
+            ChangeLog.objects.filter(object_id=recipe_id).count(), 1,
+        )
+
+    def test_sync_reports_recipe_on_tag_rename(self):
+        """Test renaming a tag reports the recipes showing it"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        token = self.client.get(SYNC_URL).data['token']
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(SYNC_URL, {'since': token})
+
+        self.assertEqual(
+            res.data['recipes']['upserted'][0]['tags'][0]['name'],
+            'Vegetarian',
+        )
+
+    def test_sync_limit_pages_through_changes(self):
+        """Test a limit returns has_more and a resumable token"""
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+
+        res = self.client.get(SYNC_URL, {'limit': 2})
+        rest = self.client.get(SYNC_URL, {'since': res.data['token']})
+
+        synced = [
+            r['id'] for r in res.data['recipes']['upserted']
+            + rest.data['recipes']['upserted']
+        ]
+        self.assertTrue(res.data['has_more'])
+        self.assertEqual(synced, [r.id for r in recipes])
+
+    def test_sync_invalid_token(self):
+        """Test an invalid token returns 400"""
+        res = self.client.get(SYNC_URL, {'since': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_delete_clears_log(self):
+        """Test deleting a user does not leave change log entries"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        self.user.delete()
+
+        self.assertFalse(ChangeLog.objects.exists())
@@ -9,6 +9,7 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.caching import get_tiered_cache
 from core.models import Tag, Recipe
 
 from recipe.serializers import TagSerializer
@@ -146,3 +147,86 @@ class PrivateTagsApiTests(TestCase):
         )
 
         self.assertEqual(len(res.data), 1)
+
+    def test_list_if_none_match_returns_304(self):
+        """Test an unchanged tag list answers 304"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_on_rename_and_delete(self):
+        """Test renaming or deleting a tag changes the list ETag"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = Tag.objects.create(user=self.user, name='Dessert')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        renamed_etag = self.client.get(TAGS_URL)['ETag']
+        other.delete()
+        deleted_etag = self.client.get(TAGS_URL)['ETag']
+
+        self.assertNotEqual(renamed_etag, etag)
+        self.assertNotEqual(deleted_etag, renamed_etag)
+
+
+class AutocompleteTagsApiTests(TestCase):
+    """Test listing tags by name prefix"""
+
+    def setUp(self):
+        get_tiered_cache().clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ('Vegan', 'vegetarian', 'Dessert', 'Veg%', 'Very hot'):
+            Tag.objects.create(user=self.user, name=name)
+        Tag.objects.create(
+            user=create_user(email='other@example.com'), name='Vegan',
+        )
+
+    def names(self, **params):
+        res = self.client.get(TAGS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [tag['name'] for tag in res.data]
+
+    def test_prefix(self):
+        """Test the user's tags starting with the prefix, ignoring case"""
+        self.assertEqual(
+            self.names(prefix='VEG'), ['Veg%', 'Vegan', 'vegetarian'],
+        )
+        self.assertEqual(self.names(prefix='veg', limit=2), ['Veg%', 'Vegan'])
+        self.assertEqual(self.names(prefix='Veg%'), ['Veg%'])
+        self.assertEqual(self.names(prefix='x'), [])
+
+    def test_prefix_cached_until_write(self):
+        """Test repeated lookups skip the database until tags change"""
+        self.names(prefix='veg')
+
+        with self.assertNumQueries(0):
+            self.names(prefix='veg')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(user=self.user, name='Vegemite')
+            # Not invalidated before the write commits
+            self.assertNotIn('Vegemite', self.names(prefix='veg'))
+        self.assertIn('Vegemite', self.names(prefix='veg'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('recipe:tag-bulk-update'), {'items': [
+                {'id': Tag.objects.get(name='Vegemite').id, 'name': 'Marmite'},
+            ]}, format='json')
+        self.assertNotIn('Vegemite', self.names(prefix='veg'))
+
+    def test_prefix_assigned_only(self):
+        """Test prefix combines with assigned_only"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        recipe.tags.add(Tag.objects.get(name='vegetarian'))
+
+        self.assertEqual(
+            self.names(prefix='veg', assigned_only=1), ['vegetarian'],
+        )
@@ -16,5 +16,16 @@ router.register('ingredients', views.IngredientViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path(
+        'shopping-list/',
+        views.ShoppingListView.as_view(),
+        name='shopping-list',
+    ),
+    path(
+        'images/<int:pk>/',
+        views.RecipeImageView.as_view(),
+        name='recipe-image',
+    ),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,6 +1,15 @@
 """
 Viws for recipe APIs
 """
+import os
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.functions import Lower
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -9,12 +18,104 @@ from drf_spectacular.utils import (
 )
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.caching import get_tiered_cache
+from core.conditional import ConditionalGetMixin, make_etag
+from core.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
+from core.models import Recipe, Tag, Ingredient, ChangeLog
+from core.renderers import NDJSONRenderer
+from core.signals import (
+    ATTR_KINDS,
+    names_namespace,
+    shopping_list_namespace,
+)
+from core.similarity import similar_recipes
+from core.thumbnails import ThumbnailCache
+from core.throttling import TokenBucketThrottle
+from recipe import bulk, serializers
+
+
+def limit_param(request, default, maximum):
+    """Return the limit query parameter within 1 and `maximum`"""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        raise ValidationError({'limit': 'Must be an integer.'})
+    return max(1, min(limit, maximum))
+
+
+class BulkActionsMixin:
+    """
+    Add bulk-delete and bulk-update actions taking lists of IDs.
+
+    Both run set-based SQL in chunks scoped to the user (see recipe.bulk)
+    and answer with the IDs changed; IDs of other users' objects or of
+    missing objects are skipped.
+    """
+    bulk_update_fields = ()  # Fields bulk-update may change
+
+    def perform_bulk_delete(self, ids):
+        """Delete the user's objects in `ids`, return the IDs deleted"""
+        model = self.queryset.model
+        if model is Recipe:
+            return bulk.delete_recipes(self.request.user, ids)
+        return bulk.delete_attrs(model, self.request.user, ids)
+
+    @extend_schema(
+        request=serializers.BulkDeleteSerializer,
+        responses=serializers.BulkResultSerializer,
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete objects by ID"""
+        serializer = serializers.BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = self.perform_bulk_delete(serializer.validated_data['ids'])
+        return Response({'ids': ids})
+
+    @extend_schema(
+        request=serializers.BulkUpdateSerializer,
+        responses=serializers.BulkResultSerializer,
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk-update')
+    def bulk_update(self, request):
+        """Update fields of objects by ID, each item with its own values"""
+        serializer = serializers.BulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        errors = {}
+        groups = defaultdict(list)  # Changed fields -> validated items
+        for index, item in enumerate(serializer.validated_data['items']):
+            data = {k: v for k, v in item.items() if k != 'id'}
+            unknown = set(data) - set(self.bulk_update_fields)
+            if type(item.get('id')) is not int or unknown or not data:
+                errors[index] = {'detail': (
+                    'Each item needs an integer id and some of: '
+                    + ', '.join(self.bulk_update_fields)
+                )}
+                continue
+            item_serializer = self.get_serializer(data=data, partial=True)
+            if not item_serializer.is_valid():
+                errors[index] = item_serializer.errors
+                continue
+            groups[tuple(sorted(data))].append(
+                {'id': item['id'], **item_serializer.validated_data}
+            )
+        if errors:
+            raise ValidationError({'items': errors})
 
-from core.models import Recipe, Tag, Ingredient
-from recipe import serializers
+        ids = []
+        for fields, items in groups.items():
+            ids += bulk.update_objects(
+                self.queryset.model, request.user, items, fields,
+            )
+        return Response({'ids': ids})
 
 
 @extend_schema_view(
@@ -31,16 +132,64 @@ from recipe import serializers
                type=OpenApiTypes.STR,
                description='Comma separated list of ingredients IDs',
                required=False,
-           )
+           ),
+           OpenApiParameter(
+               name='stream',
+               type=OpenApiTypes.INT,
+               enum=[0, 1],
+               description='Stream the list as newline delimited JSON',
+               required=False,
+           ),
        ]
-    )
+    ),
+    create=extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER]),
+    upload_image=extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER]),
+    similar=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                description='Maximum number of recipes to return',
+                required=False,
+            ),
+        ],
+        responses=serializers.SimilarRecipeSerializer(many=True),
+    ),
+    clone=extend_schema(
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
+        request=serializers.RecipeCloneSerializer,
+        responses=serializers.RecipeDetailSerializer(many=True),
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,
+                    BulkActionsMixin,
+                    viewsets.ModelViewSet):
     """Viewset for manage recipe APIs"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeDetailSerializer
+    renderer_classes = (
+        api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+    )
+    stream_chunk_size = 500  # Rows fetched and prefetched per streamed chunk
+    similar_limit = 10
+    similar_max_limit = 50
+    updated_at = None  # Of the retrieved recipe, set by get_validators
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'update': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'destroy': 'recipe_write',
+        'upload_image': 'recipe_upload',
+        'bulk_delete': 'recipe_write',
+        'bulk_update': 'recipe_write',
+        'clone': 'recipe_write',
+    }
+    bulk_update_fields = (
+        'title', 'description', 'time_minutes', 'price', 'link',
+    )
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
@@ -59,7 +208,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredient_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+        return queryset.filter(
+            user=self.request.user,
+        ).order_by('-id').distinct()
 
     def get_serializer_class(self):
         """Return appropriate serializer class for request"""
@@ -67,14 +218,146 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarRecipeSerializer
 
         return self.serializer_class
 
+    def _wants_stream(self, request):
+        """Return True if the client asked for a streamed list"""
+        return (
+            request.accepted_renderer.format == NDJSONRenderer.format
+            or request.query_params.get('stream') in ('1', 'true')
+        )
+
+    def _stream_chunks(self, queryset, serializer_class, context):
+        """Yield the queryset as NDJSON, one chunk of rows at a time"""
+        renderer = NDJSONRenderer()
+        # Only IDs are read through the server-side cursor, each chunk is
+        # then fetched with its tags and ingredients and released.
+        ids = queryset.values_list('id', flat=True).iterator(
+            chunk_size=self.stream_chunk_size
+        )
+        while True:
+            chunk = list(islice(ids, self.stream_chunk_size))
+            if not chunk:
+                break
+            recipes = Recipe.objects.filter(id__in=chunk).prefetch_related(
+                'tags', 'ingredients',
+            )
+            by_id = {recipe.id: recipe for recipe in recipes}
+            serializer = serializer_class(
+                [by_id[pk] for pk in chunk if pk in by_id],
+                many=True,
+                context=context,
+            )
+            yield renderer.render(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        """List recipes, streaming them as NDJSON when requested"""
+        if not self._wants_stream(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            self._stream_chunks(
+                queryset,
+                self.get_serializer_class(),
+                self.get_serializer_context(),
+            ),
+            content_type=NDJSONRenderer.media_type,
+        )
+        # Let nginx pass chunks through instead of buffering the response
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def get_validators(self):
+        """Return validators of the requested recipe from its updated_at"""
+        if self.action != 'retrieve':
+            return None, None
+        try:
+            updated_at = Recipe.objects.filter(
+                user=self.request.user, pk=self.kwargs['pk'],
+            ).values_list('updated_at', flat=True).first()
+        except ValueError:
+            return None, None
+        if updated_at is None:
+            return None, None
+
+        self.updated_at = updated_at
+        etag = make_etag(
+            self.kwargs['pk'],
+            updated_at.isoformat(),
+            self.request.accepted_media_type,
+        )
+        return etag, updated_at
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering 304 when it has not changed"""
+        return self.conditional(
+            self._retrieve_cached, request, *args, **kwargs
+        )
+
+    def _retrieve_cached(self, request, *args, **kwargs):
+        """Serve the recipe from the cache while its updated_at is unchanged"""
+        if self.updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        key = make_etag(
+            'recipe',
+            self.kwargs['pk'],
+            self.updated_at.isoformat(),
+            request.build_absolute_uri('/'),  # Image URLs are absolute
+        )
+        data = get_tiered_cache().get_or_set(
+            f'recipe:{key}',
+            lambda: self.get_serializer(self.get_object()).data,
+            settings.RECIPE_CACHE_TIMEOUT,
+        )
+        return Response(data)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """Create a recipe, once per Idempotency-Key"""
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Create new recipe"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """List the user's recipes sharing the most tags and ingredients"""
+        limit = limit_param(
+            request, self.similar_limit, self.similar_max_limit,
+        )
+        scores = dict(similar_recipes(self.get_object(), limit))
+        recipes = Recipe.objects.filter(id__in=scores).prefetch_related(
+            'tags', 'ingredients',
+        )
+        for recipe in recipes:
+            recipe.similarity = scores[recipe.id]
+        recipes = sorted(recipes, key=lambda r: (-r.similarity, r.id))
+        return Response(self.get_serializer(recipes, many=True).data)
+
+    @action(methods=['POST'], detail=True)
+    @idempotent
+    def clone(self, request, pk=None):
+        """Copy a recipe with its tags and ingredients"""
+        recipe = self.get_object()
+        serializer = serializers.RecipeCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        ids = bulk.clone_recipe(recipe, serializer.validated_data['copies'])
+        clones = Recipe.objects.filter(id__in=ids).order_by(
+            'id',
+        ).prefetch_related('tags', 'ingredients')
+        return Response(
+            self.get_serializer(clones, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
+    @idempotent
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
         recipe = self.get_object()
@@ -91,6 +374,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -100,28 +384,113 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 enum=[0, 1],
                 description='Filter by items assigned to recipes',
                 required=False,
-            )
+            ),
+            OpenApiParameter(
+                name='prefix',
+                type=OpenApiTypes.STR,
+                description=(
+                    'Only list the first items whose name starts with '
+                    'this, ignoring case'
+                ),
+                required=False,
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                description='Maximum number of items to return with prefix',
+                required=False,
+            ),
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(ConditionalGetMixin,
+                            BulkActionsMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    bulk_update_fields = ('name',)
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
 
     def get_queryset(self):
         """Filter queryset to authenticated user"""
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
+        prefix = self.request.query_params.get('prefix')
         queryset = self.queryset
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
+        if prefix is not None:
+            # Served by the (user_id, LOWER(name) text_pattern_ops) index
+            queryset = queryset.annotate(name_lower=Lower('name')).filter(
+                name_lower__startswith=prefix.lower(),
+            )
+
+        return queryset.filter(
+            user=self.request.user,
+        ).order_by('-name').distinct()
+
+    def get_validators(self):
+        """Return an ETag for the list from the count and last update"""
+        if self.action != 'list' or 'prefix' in self.request.query_params:
+            return None, None
+        stats = self.get_queryset().aggregate(
+            count=Count('id'), updated_at=Max('updated_at'),
+        )
+        parts = [stats['count'], stats['updated_at']]
+        if self.request.query_params.get('assigned_only'):
+            # Assignment changes bump the recipe, not the tag/ingredient
+            parts += Recipe.objects.filter(user=self.request.user).aggregate(
+                count=Count('id'), updated_at=Max('updated_at'),
+            ).values()
+
+        # Deletions do not advance updated_at, so only an ETag is returned
+        etag = make_etag(
+            *parts,
+            self.request.query_params.urlencode(),
+            self.request.accepted_media_type,
+        )
+        return etag, None
+
+    def list(self, request, *args, **kwargs):
+        """List items, answering 304 when nothing has changed"""
+        if 'prefix' in request.query_params:
+            return self.autocomplete(request)
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def autocomplete(self, request):
+        """
+        List the first items by name starting with the prefix.
+
+        Results are cached per user and prefix until the user's items
+        change (see core.signals.names_namespace); assigned_only results
+        also depend on recipes and are not cached.
+        """
+        limit = limit_param(
+            request, self.autocomplete_limit, self.autocomplete_max_limit,
+        )
 
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+        def load():
+            queryset = self.get_queryset().order_by('name_lower', 'id')
+            return self.get_serializer(queryset[:limit], many=True).data
+
+        if int(request.query_params.get('assigned_only', 0)):
+            return Response(load())
+        namespace = names_namespace(
+            ATTR_KINDS[self.queryset.model], request.user.id,
+        )
+        key = namespace.key(make_etag(
+            request.query_params['prefix'].lower(), limit,
+        ))
+        data = get_tiered_cache().get_or_set(
+            key, load, settings.AUTOCOMPLETE_CACHE_TIMEOUT,
+        )
+        return Response(data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -134,3 +503,255 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='w',
+            type=OpenApiTypes.INT,
+            enum=list(settings.THUMBNAIL_WIDTHS),
+            description='Width of the image in pixels',
+            required=True,
+        ),
+        OpenApiParameter(
+            name='v',
+            type=OpenApiTypes.STR,
+            description=(
+                'File name of the current image, without extension; the '
+                'response may then be cached forever'
+            ),
+            required=False,
+        ),
+    ],
+    responses={(200, 'image/*'): OpenApiTypes.BINARY},
+)
+class RecipeImageView(ConditionalGetMixin, APIView):
+    """Return a recipe's image resized to one of THUMBNAIL_WIDTHS"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        """Accept image types, which no renderer produces, in Accept"""
+        return super().perform_content_negotiation(request, force=True)
+
+    def get_validators(self):
+        """Return an ETag naming the variant, without rendering it"""
+        return make_etag(self.relative_path), None
+
+    def get(self, request, pk):
+        try:
+            self.width = int(request.query_params.get('w', ''))
+        except ValueError:
+            self.width = None
+        if self.width not in settings.THUMBNAIL_WIDTHS:
+            raise ValidationError({'w': 'Must be one of {}.'.format(
+                ', '.join(map(str, settings.THUMBNAIL_WIDTHS))
+            )})
+        self.recipe = get_object_or_404(
+            Recipe.objects.only('id', 'image'), pk=pk, user=request.user,
+        )
+        if not self.recipe.image:
+            raise NotFound('The recipe has no image.')
+        self.cache = ThumbnailCache()
+        self.relative_path = self.cache.relative_path(
+            self.recipe.image.name, self.width,
+        )
+        return self.conditional(self._get_variant, request)
+
+    def _get_variant(self, request):
+        try:
+            self.cache.get(self.recipe.image, self.width)
+        except OSError:  # Missing or unreadable image file
+            raise NotFound('The recipe image cannot be read.')
+
+        content_type = self.cache.content_type(self.relative_path)
+        if settings.THUMBNAIL_ACCEL_PREFIX:
+            # nginx sends the file from its internal location
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = (
+                settings.THUMBNAIL_ACCEL_PREFIX + self.relative_path
+            )
+        else:
+            response = FileResponse(
+                open(os.path.join(self.cache.root, self.relative_path), 'rb'),
+                content_type=content_type,
+            )
+
+        name = os.path.splitext(os.path.basename(self.recipe.image.name))[0]
+        if request.query_params.get('v') == name:
+            # Uploads get new file names, so this URL never changes content
+            response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='recipes',
+            type=OpenApiTypes.STR,
+            description=(
+                'Comma separated IDs of your recipes, 404 if any is unknown'
+            ),
+            required=True,
+        ),
+    ],
+    responses=serializers.ShoppingListItemSerializer(many=True),
+)
+class ShoppingListView(ConditionalGetMixin, APIView):
+    """Return the ingredients of several recipes, with how many use each"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    max_recipes = 100
+
+    def get_recipe_ids(self):
+        """Return the sorted, distinct IDs of the recipes parameter"""
+        recipes = self.request.query_params.get('recipes', '')
+        try:
+            ids = sorted({int(pk) for pk in recipes.split(',') if pk})
+        except ValueError:
+            ids = None
+        if not ids or len(ids) > self.max_recipes:
+            raise ValidationError({'recipes': (
+                f'Must be 1 to {self.max_recipes} comma separated recipe IDs.'
+            )})
+        return ids
+
+    def get_cache_key(self):
+        """Return the key of the selection, changed by the user's writes"""
+        namespace = shopping_list_namespace(self.request.user.id)
+        return namespace.key(make_etag(*self.recipe_ids))
+
+    def get_validators(self):
+        """Return an ETag from the cache key, without a query"""
+        return make_etag(
+            self.get_cache_key(), self.request.accepted_media_type,
+        ), None
+
+    def get_shopping_list(self):
+        """
+        Count the recipes using each ingredient in one grouped query.
+
+        Unknown IDs and those of other users are rejected here rather than
+        on every request: a list is only cached once all its recipes were
+        found, and deleting one changes the cache key.
+        """
+        found = set(Recipe.objects.filter(
+            user=self.request.user, id__in=self.recipe_ids,
+        ).values_list('id', flat=True))
+        missing = [pk for pk in self.recipe_ids if pk not in found]
+        if missing:
+            raise NotFound({'recipes': (
+                'No recipes with IDs '
+                f'{", ".join(str(pk) for pk in missing)}.'
+            )})
+        rows = Recipe.ingredients.through.objects.filter(
+            recipe_id__in=self.recipe_ids,
+        ).values('ingredient_id', 'ingredient__name').annotate(
+            count=Count('recipe_id'),
+        ).order_by('ingredient__name', 'ingredient_id')
+        return serializers.ShoppingListItemSerializer(rows, many=True).data
+
+    def get(self, request):
+        self.recipe_ids = self.get_recipe_ids()
+        return self.conditional(self._get_cached, request)
+
+    def _get_cached(self, request):
+        data = get_tiered_cache().get_or_set(
+            self.get_cache_key(),
+            self.get_shopping_list,
+            settings.SHOPPING_LIST_CACHE_TIMEOUT,
+        )
+        return Response(data)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='since',
+            type=OpenApiTypes.INT,
+            description='Token returned by the previous sync, 0 for all',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='limit',
+            type=OpenApiTypes.INT,
+            description='Maximum number of changes to return',
+            required=False,
+        ),
+    ],
+    responses=OpenApiTypes.OBJECT,
+)
+class SyncView(APIView):
+    """
+    Return recipes, tags and ingredients changed since a token.
+
+    The token is the last change log ID returned. A user's entries get
+    their IDs in commit order (see core.signals.log_changes), so no entry
+    below the token can still be committed later.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    default_limit = 500
+    max_limit = 5000
+    kinds = (
+        ('recipes', ChangeLog.RECIPE, Recipe,
+         serializers.RecipeDetailSerializer),
+        ('tags', ChangeLog.TAG, Tag, serializers.TagSerializer),
+        ('ingredients', ChangeLog.INGREDIENT, Ingredient,
+         serializers.IngredientSerializer),
+    )
+
+    def _int_param(self, name, default):
+        """Return a non-negative integer query parameter"""
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = -1
+        if value < 0:
+            raise ValidationError({name: 'Must be a non-negative integer.'})
+        return value
+
+    def get(self, request):
+        """Return changes after the `since` token"""
+        since = self._int_param('since', 0)
+        limit = min(
+            self._int_param('limit', self.default_limit) or 1,
+            self.max_limit,
+        )
+        entries = list(
+            ChangeLog.objects.filter(
+                user=request.user, id__gt=since,
+            ).order_by('id').values_list(
+                'id', 'kind', 'object_id', 'deleted',
+            )[:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        upserted = defaultdict(list)
+        deleted = defaultdict(list)
+        for _, kind, object_id, is_deleted in entries:
+            (deleted if is_deleted else upserted)[kind].append(object_id)
+
+        data = {
+            'token': entries[-1][0] if entries else since,
+            'has_more': has_more,
+        }
+        context = {'request': request}
+        for key, kind, model, serializer_class in self.kinds:
+            queryset = model.objects.filter(
+                user=request.user, id__in=upserted[kind],
+            ).order_by('id')
+            if model is Recipe:
+                queryset = queryset.prefetch_related('tags', 'ingredients')
+            data[key] = {
+                'upserted': serializer_class(
+                    queryset, many=True, context=context,
+                ).data if upserted[kind] else [],
+                'deleted': deleted[kind],
+            }
+        return Response(data)
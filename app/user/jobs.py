@@ -0,0 +1,17 @@
+"""
+Background jobs for users
+"""
+from core import jobs
+from core.purge import purge_user
+
+
+@jobs.job('user.purge')
+def purge(job, user_id, chunk_size=None):
+    """Delete a user and their data, reporting progress per chunk"""
+    def progress(stage, deleted):
+        jobs.set_progress(job, stage=stage, deleted=deleted)
+
+    deleted = purge_user(user_id, chunk_size=chunk_size, progress=progress)
+    if job.user_id == user_id:
+        job.user = None  # Detached by purge_user, keep it that way on save
+    return deleted
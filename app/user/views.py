@@ -1,15 +1,20 @@
 """
 Vews for user API
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+
+from core.authentication import CachedTokenAuthentication
+from core.throttling import TokenBucketThrottle
 from . import serializers
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = serializers.UserSerializer  # Set the serializer class
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'user_create'
 
 
 class CreateTokenView(ObtainAuthToken):
@@ -22,7 +27,7 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = serializers.UserSerializer  # Set the serializer class
-    authentication_classes = (authentication.TokenAuthentication,)  # Set the authentication classes
+    authentication_classes = (CachedTokenAuthentication,)  # Set the authentication classes
     permission_classes = (permissions.IsAuthenticated,)  # Set the permission classes
 
     def get_object(self):
@@ -1,13 +1,83 @@
+uwsgi_cache_path /tmp/nginx-microcache levels=1:2 keys_zone=microcache:10m
+                 max_size=${MICROCACHE_MAX_SIZE} inactive=1m use_temp_path=off;
+
+upstream app {
+    server ${APP_HOST}:${APP_PORT};
+}
+
+# Process running the full profile: admin, sessions and OpenAPI views
+upstream admin {
+    server ${ADMIN_HOST}:${APP_PORT};
+}
+
 server {
     listen ${LISTEN_PORT};
 
+    gzip              on;
+    gzip_comp_level   5;
+    gzip_min_length   1024;
+    gzip_proxied      any;
+    gzip_vary         on;
+    gzip_types        application/json application/x-ndjson
+                      application/vnd.oai.openapi application/javascript
+                      text/css text/plain image/svg+xml;
+    # Serve pre-compressed .gz siblings of static assets when present
+    gzip_static       on;
+
+    open_file_cache          max=10000 inactive=60s;
+    open_file_cache_valid    120s;
+    open_file_cache_min_uses 2;
+    open_file_cache_errors   on;
+
+    # Uploaded media are stored under UUID file names and never change
+    location /static/media {
+        alias   /vol/static/media;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
+    # Resized recipe images, sent after the app checked access with
+    # X-Accel-Redirect. The app sets Cache-Control and the ETag it answers
+    # conditional requests with, which replaces nginx's own.
+    location /protected/thumbnails/ {
+        internal;
+        alias   /vol/thumbnails/;
+        etag    off;
+        add_header ETag $upstream_http_etag;
+    }
+
     location /static {
-        alias /vol/static;
+        alias   /vol/static;
+        expires ${STATIC_EXPIRES};
+    }
+
+    location ~ ^/(admin|api/schema|api/swagger|api/redoc)(/|$) {
+        uwsgi_pass           admin;
+        include              /etc/nginx/uwsgi_params;
+        client_max_body_size 10M;
     }
 
     location / {
-        uwsgi_pass           ${APP_HOST}:${APP_PORT};
+        uwsgi_pass           app;
         include              /etc/nginx/uwsgi_params;
         client_max_body_size 10M;
+
+        uwsgi_socket_keepalive on;
+        uwsgi_connect_timeout  5s;
+        uwsgi_read_timeout     ${UWSGI_READ_TIMEOUT};
+        uwsgi_buffer_size      16k;
+        uwsgi_buffers          16 16k;
+        uwsgi_busy_buffers_size 32k;
+
+        # Micro-cache for GET/HEAD API responses, set MICROCACHE_TTL to
+        # enable. Responses are keyed per Authorization header so users
+        # never see each other's data.
+        uwsgi_cache              ${MICROCACHE_ZONE};
+        uwsgi_cache_key          "$request_method$request_uri$http_authorization$http_accept";
+        uwsgi_cache_valid        200 ${MICROCACHE_TTL};
+        uwsgi_cache_methods      GET HEAD;
+        uwsgi_cache_lock         on;
+        uwsgi_cache_use_stale    updating;
+        uwsgi_cache_bypass       $http_cache_control;
+        add_header X-Cache-Status $upstream_cache_status;
     }
-}
\ No newline at end of file
+}
@@ -2,5 +2,25 @@
 
 set -e
 
-envsubst < /etc/nginx/templates/default.conf.tpl > /etc/nginx/conf.d/default.conf
-nginx -g 'daemon off;'
\ No newline at end of file
+export ADMIN_HOST=${ADMIN_HOST:-$APP_HOST}
+export STATIC_EXPIRES=${STATIC_EXPIRES:-1h}
+export UWSGI_READ_TIMEOUT=${UWSGI_READ_TIMEOUT:-60s}
+export MICROCACHE_MAX_SIZE=${MICROCACHE_MAX_SIZE:-100m}
+export MICROCACHE_TTL=${MICROCACHE_TTL:-}
+
+# The micro-cache is off unless a TTL such as "1s" is given
+if [ -n "$MICROCACHE_TTL" ]; then
+    export MICROCACHE_ZONE=microcache
+else
+    export MICROCACHE_ZONE=off
+    export MICROCACHE_TTL=1s
+fi
+
+# Only substitute our variables so nginx variables such as $request_uri
+# are left in place.
+envsubst '${LISTEN_PORT} ${APP_HOST} ${ADMIN_HOST} ${APP_PORT} ${STATIC_EXPIRES}
+          ${UWSGI_READ_TIMEOUT} ${MICROCACHE_MAX_SIZE} ${MICROCACHE_TTL}
+          ${MICROCACHE_ZONE}' \
+    < /etc/nginx/templates/default.conf.tpl \
+    > /etc/nginx/conf.d/default.conf
+nginx -g 'daemon off;'
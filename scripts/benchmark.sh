@@ -0,0 +1,20 @@
+#!/bin/sh
+#
+# Load test a running deployment with ApacheBench, e.g.
+#   TOKEN=<api token> scripts/benchmark.sh http://localhost/api/recipe/recipes/
+# Run it once per uWSGI configuration and compare the summary lines.
+
+set -e
+
+URL=${1:?usage: benchmark.sh URL}
+REQUESTS=${REQUESTS:-5000}
+CONCURRENCY=${CONCURRENCY:-32}
+
+if [ -n "$TOKEN" ]; then
+    set -- -H "Authorization: Token $TOKEN"
+else
+    set --
+fi
+
+ab -q -k -n "$REQUESTS" -c "$CONCURRENCY" "$@" "$URL" | \
+    grep -E 'Requests per second|Time per request.*mean\)|Failed requests|  (50|99)%'
@@ -2,8 +2,44 @@
 
 set -e
 
-python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
+python manage.py wait_for_db ${REDIS_URL:+--cache default}
+# API-only workers do not have staticfiles installed; the full profile
+# process collects static files. Migrations run before either starts, in
+# the one-off migrate service of docker-compose-deploy.yml.
+if [ "${APP_PROFILE:-full}" != "api" ]; then
+    python manage.py collectstatic --noinput
+fi
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# Size the worker pool from the CPUs available to the container unless
+# overridden, see README.md for how the defaults were chosen.
+CPU_COUNT=$(nproc)
+UWSGI_WORKERS=${UWSGI_WORKERS:-$((CPU_COUNT * 2))}
+UWSGI_THREADS=${UWSGI_THREADS:-2}
+UWSGI_LISTEN=${UWSGI_LISTEN:-128}
+UWSGI_MAX_REQUESTS=${UWSGI_MAX_REQUESTS:-5000}
+UWSGI_RELOAD_ON_RSS=${UWSGI_RELOAD_ON_RSS:-256}
+UWSGI_HARAKIRI=${UWSGI_HARAKIRI:-30}
+UWSGI_STATS=${UWSGI_STATS:-/tmp/uwsgi-stats.sock}
+
+# The app is loaded once in the master (no --lazy-apps) and forked into
+# the workers; WSGI_PRELOAD makes app.wsgi import the URLconf first.
+export WSGI_PRELOAD=${WSGI_PRELOAD:-1}
+
+exec uwsgi --socket :9000 \
+    --module app.wsgi \
+    --master \
+    --need-app \
+    --single-interpreter \
+    --die-on-term \
+    --vacuum \
+    --workers "$UWSGI_WORKERS" \
+    --threads "$UWSGI_THREADS" \
+    --enable-threads \
+    --thunder-lock \
+    --listen "$UWSGI_LISTEN" \
+    --max-requests "$UWSGI_MAX_REQUESTS" \
+    --reload-on-rss "$UWSGI_RELOAD_ON_RSS" \
+    --worker-reload-mercy 30 \
+    --harakiri "$UWSGI_HARAKIRI" \
+    --memory-report \
+    --stats "$UWSGI_STATS"